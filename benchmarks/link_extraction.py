@@ -0,0 +1,104 @@
+# Parse-time benchmark: legacy BeautifulSoup brochure discovery vs insurers.links
+#
+#   python benchmarks/link_extraction.py [--fixtures DIR] [--repeat N]
+#
+# Every *.html file in the fixtures dir is parsed; save real product pages there
+# (e.g. from the fetch log of a crawl) to benchmark against live markup.
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insurers.links import extract_pdf_links
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_URL = "https://www.prudential.com.hk/en/products/health/sample-plan/"
+
+
+def legacy_extract(html, page_url):
+    """The three-pass html.parser discovery previously in insurers.prudential.download_brochures."""
+    soup = BeautifulSoup(html, 'html.parser')
+    pdf_links = []
+
+    def add_pdf_url(url):
+        full_url = urljoin(page_url, url)
+        filename = os.path.basename(urlparse(full_url).path)
+        if filename and filename != '/':
+            pdf_links.append((full_url, filename))
+
+    for a_tag in soup.find_all('a', href=True):
+        href = a_tag['href']
+        url_path = href.split("?")[0].split("#")[0]
+        if url_path.lower().endswith('.pdf'):
+            add_pdf_url(href)
+    for element in soup.find_all(attrs={"data-href": True}):
+        href = element.get('data-href', '')
+        if href.lower().endswith('.pdf'):
+            add_pdf_url(href)
+    for element in soup.find_all(attrs={"onclick": True}):
+        onclick = element.get('onclick', '')
+        if '.pdf' in onclick.lower():
+            for pdf_url in re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))*\.pdf', onclick):
+                add_pdf_url(pdf_url)
+    return pdf_links
+
+
+def single_pass_extract(html, page_url):
+    return extract_pdf_links(html, page_url)
+
+
+def load_fixtures(fixture_dir):
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    return fixtures
+
+
+def bench(fn, fixtures, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in fixtures.values():
+            fn(html, PAGE_URL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark brochure link extraction.")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Directory of saved *.html pages")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No *.html fixtures in {args.fixtures}")
+        sys.exit(1)
+
+    for name, html in fixtures.items():
+        legacy = {url for url, _ in legacy_extract(html, PAGE_URL)}
+        current = {c.url for c in single_pass_extract(html, PAGE_URL)}
+        if legacy != current:
+            print(f"[!] {name}: results differ, legacy={len(legacy)} single-pass={len(current)}")
+
+    legacy_time = bench(legacy_extract, fixtures, args.repeat)
+    current_time = bench(single_pass_extract, fixtures, args.repeat)
+    size_kb = sum(len(html) for html in fixtures.values()) / 1024
+
+    print(f"{len(fixtures)} fixtures, {size_kb:.0f} KB of HTML, best of {args.repeat}")
+    print(f"  legacy (html.parser, 3 passes): {legacy_time * 1000:8.1f} ms")
+    print(f"  single pass (lxml):             {current_time * 1000:8.1f} ms")
+    print(f"  speed-up: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
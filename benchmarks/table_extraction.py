@@ -0,0 +1,86 @@
+# Parse-time benchmark: legacy per-table pd.read_html vs medical/html_tables
+#
+#   python benchmarks/table_extraction.py [--tables N] [--rows N] [--repeat N]
+#
+# A synthetic CHP-style statistics page is generated: N tables with merged
+# header cells, row groups (rowspan) and thousands separators.
+
+import argparse
+import os
+import sys
+import time
+from io import StringIO
+
+import lxml.html
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "medical"))
+
+from html_tables import extract_tables
+
+
+def synthetic_page(tables, rows):
+    parts = ["<html><head><title>Statistics</title></head><body><h1>Notifiable diseases</h1>"]
+    for t in range(tables):
+        parts.append(
+            f"<table><caption>Table {t}</caption>"
+            "<thead><tr><th rowspan='2'>Year</th><th rowspan='2'>Week</th><th colspan='3'>Cases</th></tr>"
+            "<tr><th>Male</th><th>Female</th><th>Total</th></tr></thead><tbody>"
+        )
+        for r in range(rows):
+            year = f"<td rowspan='4'>{2000 + r // 4}</td>" if r % 4 == 0 else ""
+            parts.append(f"<tr>{year}<td>{r % 4 + 1}</td><td>{r * 37:,}</td><td>{r * 41:,}</td><td>{r * 78:,}</td></tr>")
+        parts.append("</tbody></table>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def legacy_extract(html):
+    """The BeautifulSoup + per-table pd.read_html path previously in medical/hk_chp.crawl_page."""
+    soup = BeautifulSoup(html, "html.parser")
+    frames = []
+    for table in soup.find_all("table"):
+        if table.find("table"):
+            continue
+        frames.append(pd.read_html(StringIO(str(table)), header=0)[0])
+    return frames
+
+
+def lxml_extract(html):
+    return [df for _, df in extract_tables(lxml.html.fromstring(html))]
+
+
+def bench(fn, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML table extraction.")
+    parser.add_argument("--tables", type=int, default=40, help="Tables on the synthetic page")
+    parser.add_argument("--rows", type=int, default=200, help="Rows per table")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    html = synthetic_page(args.tables, args.rows)
+    legacy = legacy_extract(html)
+    current = lxml_extract(html)
+    if [df.shape for df in legacy] != [df.shape for df in current]:
+        print("[!] table shapes differ between implementations")
+
+    legacy_time = bench(legacy_extract, html, args.repeat)
+    current_time = bench(lxml_extract, html, args.repeat)
+
+    print(f"{args.tables} tables x {args.rows} rows, {len(html) / 1024:.0f} KB of HTML, best of {args.repeat}")
+    print(f"  legacy (soup + pd.read_html per table): {legacy_time * 1000:8.1f} ms")
+    print(f"  one lxml tree:                          {current_time * 1000:8.1f} ms")
+    print(f"  speed-up: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
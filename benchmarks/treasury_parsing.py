@@ -0,0 +1,107 @@
+# Parse-time benchmark: legacy us_treasury.get_data coercion vs schema-driven parse_records
+#
+#   python benchmarks/treasury_parsing.py [--rows N] [--repeat N]
+#
+# A synthetic Fiscal Data avg_interest_rates payload (all values as strings,
+# with occasional "null"s, as the API returns them) is parsed by both paths.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "financial"))
+
+from us_treasury import parse_records
+
+DATA_TYPES = {
+    "record_date": "DATE",
+    "security_type_desc": "STRING",
+    "security_desc": "STRING",
+    "avg_interest_rate_amt": "PERCENTAGE",
+    "src_line_nbr": "INTEGER",
+    "record_fiscal_year": "YEAR",
+    "record_fiscal_quarter": "QUARTER",
+    "record_calendar_year": "YEAR",
+    "record_calendar_quarter": "QUARTER",
+    "record_calendar_month": "MONTH",
+    "record_calendar_day": "DAY",
+}
+SECURITIES = ["Treasury Bills", "Treasury Notes", "Treasury Bonds", "TIPS", "Floating Rate Notes", "Federal Financing Bank"]
+
+
+def synthetic_records(rows, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        year, month = 2001 + (i // 200) % 25, 1 + (i // 17) % 12
+        records.append({
+            "record_date": f"{year}-{month:02d}-28",
+            "security_type_desc": "Marketable" if i % 3 else "Non-marketable",
+            "security_desc": SECURITIES[i % len(SECURITIES)],
+            "avg_interest_rate_amt": "null" if i % 97 == 0 else f"{rng.uniform(0, 8):.3f}",
+            "src_line_nbr": str(1 + i % 20),
+            "record_fiscal_year": str(year + (month >= 10)),
+            "record_fiscal_quarter": str(1 + ((month + 2) % 12) // 3),
+            "record_calendar_year": str(year),
+            "record_calendar_quarter": str(1 + (month - 1) // 3),
+            "record_calendar_month": f"{month:02d}",
+            "record_calendar_day": "28",
+        })
+    return records
+
+
+def legacy_parse(records, page_size=100):
+    """The per-page, per-column path previously in financial/us_treasury.get_data + crawl_pages."""
+    frames = []
+    for start in range(0, len(records), page_size):
+        df = pd.DataFrame(records[start:start + page_size])
+        numerical_cols = set(df.columns[3:])
+        for col in df.columns:
+            if col in numerical_cols:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            if col == 'record_date':
+                df[col] = pd.to_datetime(df[col])
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def schema_parse(records, page_size=100):
+    return parse_records(records, DATA_TYPES)
+
+
+def bench(fn, records, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(records)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Fiscal Data payload parsing.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Records in the synthetic payload")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    records = synthetic_records(args.rows)
+    legacy = legacy_parse(records)
+    current = schema_parse(records)
+    if legacy.shape != current.shape or not legacy["avg_interest_rate_amt"].equals(current["avg_interest_rate_amt"]):
+        print("[!] results differ between implementations")
+
+    legacy_time = bench(legacy_parse, records, args.repeat)
+    current_time = bench(schema_parse, records, args.repeat)
+
+    print(f"{args.rows} records, best of {args.repeat}")
+    print(f"  legacy (per page, per column): {legacy_time * 1000:8.1f} ms")
+    print(f"  schema-driven, one pass:       {current_time * 1000:8.1f} ms")
+    print(f"  speed-up: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
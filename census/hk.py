@@ -1,31 +1,37 @@
+import argparse
 import os
-import requests
-from playwright.sync_api import sync_playwright
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insurers.browser_pool import SITE_WAITS, goto_sync, sync_page
+from common.download_index import DOWNLOADED, FAILED, UNCHANGED, DownloadIndex, download
+from common.session import build_session
+from common.workbooks import STORE_DIR, ingest
 
 MEDICAL_INSURANCE = "https://www.censtatd.gov.hk/en/EIndexbySubject.html?pcode=C0000056&scode=380"
 OUTPUT_DIR = "./census/data"
+INDEX_FILE = os.path.join(OUTPUT_DIR, ".download_index.json")
+DOWNLOAD_WORKERS = 4  # the site throttles aggressive clients; keep the pool small
+CHUNK_SIZE = 256 * 1024
 
-def download_census_data():
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-
+def harvest_links():
+    """Excel links on the subject page plus the cookies and user agent of the browser that loaded it."""
     hrefs = []
     cookies = []
     user_agent = ""
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-        
+    with sync_page() as page:
         print(f"Navigating to {MEDICAL_INSURANCE}...")
         try:
-            page.goto(MEDICAL_INSURANCE, wait_until='networkidle')
-            
+            goto_sync(page, MEDICAL_INSURANCE, SITE_WAITS["census_hk"])
+
             # Extract Cookies and User Agent
-            cookies = context.cookies()
+            cookies = page.context.cookies()
             user_agent = page.evaluate("navigator.userAgent")
-            
+
             # Extract absolute URLs for Excel files
             # Using JS execution to get the 'href' property ensures we get absolute URLs
             hrefs = page.evaluate("""() => {
@@ -33,44 +39,65 @@ def download_census_data():
                     .map(a => a.href)
                     .filter(href => href.toLowerCase().endsWith('.xls') || href.toLowerCase().endsWith('.xlsx'));
             }""")
-            
+
             print(f"Found {len(hrefs)} Excel links.")
-            
+
         except Exception as e:
             print(f"Error during Playwright execution: {e}")
-        finally:
-            browser.close()
 
-    # Prepare requests session with captured credentials
-    session = requests.Session()
-    
-    # Set cookies
+    return sorted(set(hrefs)), cookies, user_agent
+
+def browser_session(cookies, user_agent, pool_size=DOWNLOAD_WORKERS):
+    """Pooled session carrying the browser's cookies, user agent and the subject page as referer."""
+    session = build_session(pool_size=pool_size, user_agent=user_agent) if user_agent else build_session(pool_size=pool_size)
     for cookie in cookies:
         session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'])
-    
-    # Set headers
-    session.headers.update({
-        "User-Agent": user_agent,
-        "Referer": MEDICAL_INSURANCE
-    })
-    
-    for url in sorted(set(hrefs)): # unique and sorted
-        try:
-            filename = url.split('/')[-1]
-            filepath = os.path.join(OUTPUT_DIR, filename)
-            
-            print(f"Downloading {filename}...")
-            response = session.get(url, stream=True)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
+    session.headers.update({"Referer": MEDICAL_INSURANCE})
+    return session
+
+def download_files(session, urls, workers=DOWNLOAD_WORKERS, index=None, force=False):
+    """
+    Downloads `urls` into OUTPUT_DIR, `workers` at a time. With an `index`, files
+    already downloaded are revalidated with a conditional GET and skipped if unchanged
+    (unless `force`).
+    Returns {url: (status, path)}.
+    """
+    def fetch(url):
+        filepath = os.path.join(OUTPUT_DIR, unquote(os.path.basename(urlparse(url).path)))
+        status = download(session, url, filepath, index, chunk_size=CHUNK_SIZE, conditional=not force)
+        if status == DOWNLOADED:
             print(f"Saved to {filepath}")
-            
-        except Exception as e:
-            print(f"Failed to download {url}: {e}")
+        elif status == UNCHANGED:
+            print(f"[~] Unchanged: {os.path.basename(filepath)}")
+        return url, (status, filepath)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(fetch, urls))
+
+def download_census_data(workers=DOWNLOAD_WORKERS, parquet=False, force=False):
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+
+    hrefs, cookies, user_agent = harvest_links()
+    if not hrefs:
+        return
+
+    session = browser_session(cookies, user_agent, workers)
+    with DownloadIndex(INDEX_FILE) as index:
+        results = download_files(session, hrefs, workers, index, force)
+    session.close()
+
+    statuses = [status for status, _ in results.values()]
+    print(f"[*] {statuses.count(DOWNLOADED)} downloaded, {statuses.count(UNCHANGED)} unchanged, {statuses.count(FAILED)} failed")
+
+    if parquet:
+        # only new or changed workbooks are parsed (see common.workbooks)
+        ingest({"census_hk": OUTPUT_DIR})
 
 if __name__ == '__main__':
-    download_census_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download the Census and Statistics Department medical insurance tables.")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--parquet", action="store_true", help=f"Also ingest new or changed workbooks into the Parquet store in {STORE_DIR}")
+    parser.add_argument("--force", action="store_true", help="Download every file, even if unchanged")
+    args = parser.parse_args()
+    download_census_data(args.workers, args.parquet, args.force)
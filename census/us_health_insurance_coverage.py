@@ -1,18 +1,118 @@
 import argparse
+import itertools
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import requests
 
-def fetch_census_data(group_code):
-    url = f"https://api.census.gov/data/2024/acs/acs1/subject?get=group({group_code})&ucgid=0100000US"
-    
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.http_cache import add_cache_arguments, cache_from_args, fetch_json
+from common.session import build_session
+
+BASE_URL = "https://api.census.gov/data"
+DEFAULT_YEAR = 2024
+OUTPUT_FILE = "./census/data/us_health_insurance_coverage.parquet"
+
+# geography name -> query params; anything else is passed as `for` (e.g. "county:*")
+GEOGRAPHIES = {
+    "us": {"ucgid": "0100000US"},
+    "states": {"for": "state:*"},
+}
+
+# Estimate / margin-of-error variables, e.g. S2701_C01_001E, B27001_002M
+VARIABLE_RE = re.compile(r"^(?P<variable>[A-Z]+\d+[A-Z]?_\w+?)(?P<kind>E|M)$")
+MEASURES = {"E": "estimate", "M": "margin"}
+# Census annotates missing values with large negative sentinels (-666666666, -999999999, ...)
+SENTINEL_FLOOR = -555555555
+
+
+def dataset_path(group_code):
+    """ACS 1-year dataset holding a table: subject (S), data profile (DP) or detailed (B/C) tables."""
+    if group_code.startswith("S"):
+        return "acs/acs1/subject"
+    if group_code.startswith("DP"):
+        return "acs/acs1/profile"
+    return "acs/acs1"
+
+
+def geography_params(geo):
+    return GEOGRAPHIES.get(geo, {"for": geo})
+
+
+def fetch_census_data(group_code, cache=None, session=None, geo="us", year=DEFAULT_YEAR):
+    """
+    ACS 1-year table `group_code` for a geography (default: the whole US).
+    The response goes through `cache` (a common.http_cache.ResponseCache) if given.
+    Returns None if the request fails or the response is not a table.
+    """
+    url = f"{BASE_URL}/{year}/{dataset_path(group_code)}"
+    params = {"get": f"group({group_code})", **geography_params(geo)}
+
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_json(session, url, params, cache)
         return pd.DataFrame(data[1:], columns=data[0])
-    except:
+    except (requests.RequestException, ValueError, IndexError, TypeError) as e:
+        print(f"[!] {group_code} {geo} {year}: {e}")
         return None
 
+
+def to_long(df, group_code, geo, year):
+    """
+    One row per geography and variable: estimates and margins side by side as
+    float64, converted in one vectorized pass. Annotation columns are dropped.
+    """
+    value_columns = [col for col in df.columns if VARIABLE_RE.match(col)]
+    id_columns = [col for col in ("GEO_ID", "NAME") if col in df.columns]
+    long = df.melt(id_vars=id_columns, value_vars=value_columns, var_name="column", value_name="value")
+
+    parts = long["column"].str.extract(VARIABLE_RE)
+    long["variable"] = parts["variable"]
+    long["measure"] = parts["kind"].map(MEASURES)
+    values = pd.to_numeric(long["value"], errors="coerce")
+    long["value"] = values.mask(values <= SENTINEL_FLOOR)
+
+    long = long.set_index(id_columns + ["variable", "measure"])["value"].unstack("measure").reset_index()
+    long.columns.name = None
+    long.insert(0, "year", year)
+    long.insert(1, "group", group_code)
+    long.insert(2, "geography", geo)
+    return long
+
+
+def fetch_batch(groups, geos=("us",), years=(DEFAULT_YEAR,), cache=None, workers=6):
+    """
+    Fetches every (group, geography, year) combination concurrently, at most
+    `workers` requests at a time, and returns one long-format DataFrame plus
+    the combinations that failed.
+    """
+    jobs = list(itertools.product(groups, geos, years))
+    session = build_session(pool_size=workers)
+
+    def run(job):
+        group_code, geo, year = job
+        df = fetch_census_data(group_code, cache, session, geo, year)
+        return None if df is None or df.empty else to_long(df, group_code, geo, year)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, jobs))
+    session.close()
+
+    failed = [job for job, result in zip(jobs, results) if result is None]
+    frames = [result for result in results if result is not None]
+    if not frames:
+        return pd.DataFrame(), failed
+
+    panel = pd.concat(frames, ignore_index=True)
+    for col in ("group", "geography", "GEO_ID", "NAME", "variable"):
+        if col in panel.columns:
+            panel[col] = panel[col].astype("category")
+    return panel, failed
+
+
 def main():
     help_text = """
     S2701: Selected characteristics of health insurance coverage
@@ -20,15 +120,40 @@ def main():
     S2703: Private health insurance by type and selected characteristics
     S2704: Public health insurance by type and selected characteristics
     B27001: Health Insurance Coverage Status by Sex by Age
+
+    Batch example (all states, three years, one Parquet file):
+      python census/us_health_insurance_coverage.py -g S2701 S2702 S2703 S2704 B27001 \\
+          --geo us states --year 2022 2023 2024 -o census/data/coverage_panel.parquet
     """
-    
+
     parser = argparse.ArgumentParser(epilog=help_text, formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument("-g", "--group", required=True)
+    parser.add_argument("-g", "--group", nargs="+", required=True, help="ACS table(s)")
+    parser.add_argument("--geo", nargs="+", default=["us"], help="us, states, or a Census `for` clause such as county:*")
+    parser.add_argument("--year", nargs="+", type=int, default=[DEFAULT_YEAR], help="ACS 1-year vintage(s)")
+    parser.add_argument("--workers", type=int, default=6, help="Requests in flight")
+    parser.add_argument("-o", "--output", nargs="?", const=OUTPUT_FILE, help="Write the long-format panel to this Parquet file")
+    add_cache_arguments(parser)
     args = parser.parse_args()
-    
-    df = fetch_census_data(args.group)
-    if df is not None:
-        print(df)
+    cache = cache_from_args(args)
+
+    if len(args.group) == 1 and len(args.geo) == 1 and len(args.year) == 1 and not args.output:
+        df = fetch_census_data(args.group[0], cache, geo=args.geo[0], year=args.year[0])
+        if df is not None:
+            print(df)
+        return
+
+    panel, failed = fetch_batch(args.group, args.geo, args.year, cache, args.workers)
+    for group_code, geo, year in failed:
+        print(f"[-] No data: {group_code} {geo} {year}")
+    if panel.empty:
+        sys.exit(1)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        panel.to_parquet(args.output, index=False)
+        print(f"[*] {len(panel)} rows written to {args.output}")
+    else:
+        print(panel)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+CHUNK_SIZE = 256 * 1024
+
+DOWNLOADED, UNCHANGED, FAILED = "downloaded", "unchanged", "failed"
+
+
+class DownloadIndex:
+    """
+    What was downloaded from each URL: local path, size, ETag / Last-Modified and
+    SHA-256, kept as JSON next to the downloads. Thread-safe; call `save()` (or
+    use it as a context manager) to persist.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries: Dict[str, dict] = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(url)
+
+    def put(self, url: str, **entry):
+        with self._lock:
+            self._entries[url] = {**entry, "checked_at": time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def conditional_headers(self, url: str, file_path: str) -> Dict[str, str]:
+        """Validators for a conditional GET, only if the recorded file is still on disk with its size."""
+        entry = self.get(url)
+        if entry is None or not os.path.exists(file_path) or os.path.getsize(file_path) != entry.get("size"):
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+def download(session, url: str, file_path: str, index: Optional[DownloadIndex] = None,
+             timeout=30, chunk_size=CHUNK_SIZE, conditional=True, content_types=None) -> str:
+    """
+    Streams `url` to `file_path` (via a temporary file, so a failed download never
+    leaves a partial file behind). With an `index`, the request is conditional and
+    a 304 leaves the file alone (`conditional=False` always sends a plain GET, still
+    recording the result). A body with the recorded SHA-256, e.g. from a server that
+    sends no validators, counts as UNCHANGED and the file is kept. If `content_types`
+    is given, a response whose Content-Type contains none of them (e.g. an HTML
+    error page) is rejected.
+    `session` may be a requests or curl_cffi session. Returns DOWNLOADED, UNCHANGED or FAILED.
+    """
+    headers = index.conditional_headers(url, file_path) if index is not None and conditional else {}
+    previous = index.get(url) if index is not None else None
+    tmp_path = f"{file_path}.{threading.get_ident()}.part"
+    try:
+        response = (session or requests).get(url, headers=headers, stream=True, timeout=timeout)
+        try:
+            if response.status_code == 304 and headers:
+                return UNCHANGED
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").lower()
+            if content_types and not any(t in content_type for t in content_types):
+                print(f"[!] Unexpected content type for {url}: {content_type or 'none'}")
+                return FAILED
+            digest = hashlib.sha256()
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        finally:
+            response.close()
+        sha256 = digest.hexdigest()
+        if (previous and previous.get("sha256") == sha256 and previous.get("path") == file_path
+                and os.path.exists(file_path) and os.path.getsize(file_path) == previous.get("size")):
+            os.remove(tmp_path)
+            status = UNCHANGED
+        else:
+            os.replace(tmp_path, file_path)
+            status = DOWNLOADED
+    # curl_cffi's RequestException is an OSError
+    except (requests.RequestException, OSError) as e:
+        print(f"[!] Failed to download {url}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return FAILED
+
+    if index is not None:
+        index.put(url, path=file_path, size=size, sha256=sha256, etag=etag, last_modified=last_modified)
+    return status
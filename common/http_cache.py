@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Mapping, Optional
+
+import requests
+
+HTTP_CACHE_DIR = os.path.join(os.getenv("AIA_CACHE_DIR", ".cache"), "http")
+DEFAULT_TTL = 12 * 3600  # public statistics change at most daily
+
+
+class ResponseCache:
+    """
+    Cache of JSON API responses keyed by URL and query parameters, shared by the
+    census and financial scripts (under the same AIA_CACHE_DIR as the crawl state).
+
+    Entries are stored gzip-compressed on disk with their ETag / Last-Modified and
+    kept in memory once read, so repeated lookups in one process skip the disk.
+    A fresh entry (younger than `ttl` seconds) is served as-is; a stale one is
+    revalidated with a conditional GET and reused on 304. With `refresh` every
+    lookup revalidates, whatever the entry's age.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, ttl: float = DEFAULT_TTL, refresh: bool = False):
+        self.directory = directory
+        self.ttl = ttl
+        self.refresh = refresh
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: Optional[Mapping] = None) -> str:
+        canonical = json.dumps([url, sorted((str(k), str(v)) for k, v in (params or {}).items())])
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def _load(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[key] = entry
+        return entry
+
+    def _store(self, key: str, entry: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._memory[key] = entry
+
+    def get(self, url: str, params: Optional[Mapping] = None) -> Optional[Any]:
+        """The cached payload if it is fresh, else None."""
+        entry = self._load(self.key(url, params))
+        if entry is None or self.refresh or time.time() - entry["fetched_at"] > self.ttl:
+            return None
+        return entry["payload"]
+
+    def put(self, url: str, params: Optional[Mapping], payload: Any, etag=None, last_modified=None):
+        self._store(self.key(url, params), {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "payload": payload,
+        })
+
+    def fetch_json(self, session, url: str, params: Optional[Mapping] = None, timeout=15) -> Any:
+        """GET `url` as JSON through the cache (fresh hit, 304 revalidation or full fetch)."""
+        key = self.key(url, params)
+        entry = self._load(key)
+        if entry is not None and not self.refresh and time.time() - entry["fetched_at"] <= self.ttl:
+            return entry["payload"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        resp = (session or requests).get(url, params=params, headers=headers, timeout=timeout)
+        if resp.status_code == 304 and entry is not None:
+            self._store(key, {**entry, "fetched_at": time.time()})
+            return entry["payload"]
+        resp.raise_for_status()
+        payload = resp.json()
+        self.put(url, params, payload, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        return payload
+
+
+def fetch_json(session, url: str, params: Optional[Mapping] = None, cache: Optional[ResponseCache] = None, timeout=15) -> Any:
+    """GET `url` as JSON, through `cache` if given."""
+    if cache is not None:
+        return cache.fetch_json(session, url, params, timeout)
+    resp = (session or requests).get(url, params=params, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def add_cache_arguments(parser):
+    """The shared --no-cache / --refresh / --cache-ttl switches."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    group.add_argument("--refresh", action="store_true", help="Revalidate every cached response with the server")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL, help="Seconds a cached response is served without revalidation")
+
+
+def cache_from_args(args) -> Optional[ResponseCache]:
+    if args.no_cache:
+        return None
+    return ResponseCache(ttl=args.cache_ttl, refresh=args.refresh)
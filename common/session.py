@@ -0,0 +1,39 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+IMPERSONATE = "chrome110"  # curl_cffi browser fingerprint for sites that reject plain clients
+# headers of the file downloads made through impersonated sessions
+DOWNLOAD_HEADERS = {
+    "User-Agent": "Chrome/120.0.0.0",
+    "Content-Type": "application/pdf",
+    "Accept": "application/pdf",
+    "Accept-Encoding": "gzip, deflate, br",
+}
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def build_session(pool_size=10, retries=2, user_agent=USER_AGENT) -> requests.Session:
+    """
+    A requests session with a connection pool sized for `pool_size` concurrent
+    hosts/requests, retrying connection errors and throttling/server errors.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": user_agent})
+    return session
+
+
+def impersonated_session(headers=None):
+    """
+    A curl_cffi session impersonating Chrome, for downloading many files from sites
+    that fingerprint clients. Safe to share between threads (each thread gets its
+    own curl handle).
+    """
+    from curl_cffi import requests as curl_requests
+
+    return curl_requests.Session(headers={**DOWNLOAD_HEADERS, **(headers or {})}, impersonate=IMPERSONATE)
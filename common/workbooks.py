@@ -0,0 +1,343 @@
+# Excel ingestion: turns downloaded .xls/.xlsx workbooks into one partitioned Parquet store.
+#
+#   python -m common.workbooks                        # census/data + separate_tables/attachments
+#   python -m common.workbooks --source census_hk=./census/data --workers 4
+#
+# Every sheet is normalised to long format (one row per data cell, with its row
+# label, column header and numeric value), so all tables share one schema and can
+# be queried together:
+#
+#   pd.read_parquet("data/workbooks", filters=[("source", "=", "census_hk")])
+#
+# The store is partitioned as source=<name>/workbook=<slug>-<hash>/data.parquet
+# (the hash of the workbook's path keeps "Table 1.xls" and "table_1.xls" apart), and
+# _manifest.json records each workbook's size, mtime, hash and tables; reruns only
+# parse workbooks that are new or changed.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_SOURCES = {
+    "census_hk": "./census/data",
+    "chp": "./separate_tables/attachments",
+}
+STORE_DIR = "./data/workbooks"
+MANIFEST_NAME = "_manifest.json"  # "_" prefix: skipped when the store is read as a dataset
+EXTENSIONS = (".xls", ".xlsx", ".xlsm")
+
+HEADER_SCAN_ROWS = 40  # header rows sit above the first data row, within the top of the sheet
+MAX_HEADER_ROWS = 3
+NUMBER_RE = re.compile(r"^[-+]?\(?[\d,]*\.?\d+\)?%?[*#†‡§]*$")
+MISSING_MARKERS = {"", "-", "--", "—", "n.a.", "N.A.", "NA", "..", "…", "§", "*", "#", "x", "X"}
+
+SCHEMA = pa.schema([
+    ("sheet", pa.string()),
+    ("title", pa.string()),
+    ("row", pa.int32()),
+    ("row_label", pa.string()),
+    ("column", pa.string()),
+    ("value", pa.string()),
+    ("number", pa.float64()),
+])
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", str(text)).strip("_").lower() or "untitled"
+
+
+def workbook_partition(key: str) -> str:
+    """Partition directory of a workbook, relative to the store: its slug plus a short hash of `key`."""
+    source, _, relpath = key.partition("/")
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(f"source={source}", f"workbook={slugify(relpath)}-{digest}")
+
+
+def iter_sheets(path: str):
+    """(sheet name, list of row tuples) for each sheet; .xlsx is streamed with openpyxl in read-only mode."""
+    if path.lower().endswith(".xls"):
+        import xlrd
+
+        book = xlrd.open_workbook(path, on_demand=True)
+        try:
+            for name in book.sheet_names():
+                sheet = book.sheet_by_name(name)
+                yield name, [tuple(sheet.row_values(i)) for i in range(sheet.nrows)]
+                book.unload_sheet(name)
+        finally:
+            book.release_resources()
+        return
+
+    from openpyxl import load_workbook
+
+    book = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in book.worksheets:
+            yield sheet.title, list(sheet.iter_rows(values_only=True))
+    finally:
+        book.close()
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return " ".join(str(value).split())
+
+
+def _is_number(text: str) -> bool:
+    return bool(text) and bool(NUMBER_RE.match(text))
+
+
+def _is_year_row(values: List[str]) -> bool:
+    """Column headers such as 2019 | 2020 | 2021 look numeric but label the columns."""
+    return len(set(values)) == len(values) and all(text.isdigit() and 1900 <= int(text) <= 2100 for text in values)
+
+
+def detect_header(grid: List[List[str]]) -> Optional[int]:
+    """
+    Index of the first data row: the first row (within HEADER_SCAN_ROWS) where at
+    least half of the filled cells after the row label are numbers (rows of years
+    are headers). The rows just above it are the header; None if the sheet has no
+    numeric table.
+    """
+    for i, row in enumerate(grid[:HEADER_SCAN_ROWS]):
+        values = [text for text in row[1:] if text]
+        if values and sum(_is_number(text) for text in values) * 2 >= len(values) and not _is_year_row(values):
+            return i
+    return None
+
+
+def header_labels(grid: List[List[str]], first_data: int, width: int) -> Tuple[List[str], int]:
+    """
+    Column labels from up to MAX_HEADER_ROWS rows (with two or more filled cells)
+    above the first data row, and the index of the first header row. Labels of
+    merged cells (only set on their first column) are carried right, and multi-row
+    headers are joined with " / ".
+    """
+    rows = []
+    i = first_data - 1
+    while i >= 0 and len(rows) < MAX_HEADER_ROWS and sum(bool(text) for text in grid[i]) > 1:
+        rows.insert(0, grid[i])
+        i -= 1
+
+    parts = [[] for _ in range(width)]
+    for row in rows:
+        carried = ""
+        for col in range(width):
+            text = row[col] if col < len(row) else ""
+            carried = text or (carried if col > 0 else "")
+            if carried and (not parts[col] or parts[col][-1] != carried):
+                parts[col].append(carried)
+
+    labels, seen = [], {}
+    for col, part in enumerate(parts):
+        label = " / ".join(part) or f"column_{col}"
+        seen[label] = seen.get(label, 0) + 1
+        labels.append(label if seen[label] == 1 else f"{label}_{seen[label] - 1}")
+    return labels, i + 1
+
+
+def normalise_sheet(name: str, rows: Sequence[tuple]) -> Optional[pd.DataFrame]:
+    """
+    Long-format table of one sheet (see SCHEMA), or None if it holds no numeric
+    table. Title rows above the header and single-cell footnotes below the data
+    are dropped; the title is kept in its own column.
+    """
+    grid = [[_cell_text(value) for value in row] for row in rows]
+    grid = [row for row in grid if any(row)]
+    if not grid:
+        return None
+    width = max(len(row) for row in grid)
+    grid = [row + [""] * (width - len(row)) for row in grid]
+
+    first_data = detect_header(grid)
+    if first_data is None:
+        return None
+    labels, header_start = header_labels(grid, first_data, width)
+    title = next((text for text in grid[0] if text), "") if header_start > 0 else ""
+
+    body = grid[first_data:]
+    while body and sum(bool(text) for text in body[-1]) <= 1:
+        body.pop()
+    if not body:
+        return None
+
+    wide = pd.DataFrame(body, columns=labels)
+    wide.insert(0, "row", range(len(wide)))
+    wide.insert(1, "row_label", wide[labels[0]])
+    long = wide.melt(id_vars=["row", "row_label"], value_vars=labels[1:], var_name="column", value_name="value")
+    long = long[long["value"] != ""]
+
+    cleaned = long["value"].str.replace(r"[,%*#†‡§\s]", "", regex=True).str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    long["number"] = pd.to_numeric(cleaned.mask(long["value"].isin(MISSING_MARKERS)), errors="coerce")
+    long.insert(0, "sheet", name)
+    long.insert(1, "title", title)
+    long["row"] = long["row"].astype("int32")
+    return long.reset_index(drop=True)
+
+
+def ingest_workbook(path: str, partition_dir: str) -> dict:
+    """
+    Parses one workbook and writes its tables to `partition_dir/data.parquet`
+    (replacing the partition). Runs in a worker process; returns the manifest entry.
+    """
+    tables, frames = [], []
+    try:
+        for name, rows in iter_sheets(path):
+            df = normalise_sheet(name, rows)
+            if df is None or df.empty:
+                continue
+            frames.append(df)
+            tables.append({"sheet": name, "title": df["title"].iat[0], "cells": len(df),
+                           "rows": int(df["row"].max()) + 1, "columns": int(df["column"].nunique())})
+    except Exception as e:
+        return {"status": "failed", "error": f"{type(e).__name__}: {e}", "tables": []}
+
+    shutil.rmtree(partition_dir, ignore_errors=True)
+    if frames:
+        os.makedirs(partition_dir, exist_ok=True)
+        table = pa.Table.from_pandas(pd.concat(frames, ignore_index=True), schema=SCHEMA, preserve_index=False)
+        pq.write_table(table, os.path.join(partition_dir, "data.parquet"), compression="zstd")
+    return {"status": "ok" if frames else "empty", "tables": tables}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(store: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(store, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)["workbooks"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_manifest(store: str, workbooks: Dict[str, dict]):
+    os.makedirs(store, exist_ok=True)
+    path = os.path.join(store, MANIFEST_NAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"workbooks": workbooks}, f, indent=2, sort_keys=True, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def find_workbooks(sources: Dict[str, str]):
+    """(source, manifest key, path) of every workbook under the source directories."""
+    for source, directory in sources.items():
+        if not os.path.isdir(directory):
+            print(f"[-] {source}: {directory} not found")
+            continue
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                if filename.lower().endswith(EXTENSIONS) and not filename.startswith(("~$", ".")):
+                    path = os.path.join(root, filename)
+                    yield source, f"{source}/{os.path.relpath(path, directory)}", path
+
+
+def pending_workbooks(sources: Dict[str, str], manifest: Dict[str, dict], force=False):
+    """
+    Workbooks that are new or changed since the manifest entry, failed last time
+    (e.g. still downloading) or stored under another partition name. Size and mtime
+    are checked first; a changed mtime with an unchanged hash only refreshes the entry.
+    """
+    pending = []
+    for source, key, path in find_workbooks(sources):
+        stat = os.stat(path)
+        entry = manifest.get(key)
+        if (not force and entry is not None and entry.get("status") != "failed"
+                and entry.get("partition") == workbook_partition(key) and entry["size"] == stat.st_size):
+            if entry["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            sha256 = file_sha256(path)
+            if sha256 == entry["sha256"]:
+                entry["mtime_ns"] = stat.st_mtime_ns
+                continue
+        pending.append((source, key, path, stat))
+    return pending
+
+
+def ingest(sources: Dict[str, str] = DEFAULT_SOURCES, store: str = STORE_DIR, workers: Optional[int] = None,
+           force=False) -> Dict[str, dict]:
+    """
+    Parses new or changed workbooks of `sources` ({name: directory}) in a process
+    pool into the store and updates its manifest. Returns the entries written this run.
+    """
+    manifest = load_manifest(store)
+    pending = pending_workbooks(sources, manifest, force)
+    if not pending:
+        print(f"[*] No new workbooks ({len(manifest)} in {store})")
+        save_manifest(store, manifest)
+        return {}
+
+    print(f"[*] Ingesting {len(pending)} workbook(s) into {store}")
+    done = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for source, key, path, stat in pending:
+            partition = os.path.join(store, workbook_partition(key))
+            future = pool.submit(ingest_workbook, path, partition)
+            futures[future] = (key, path, stat, partition)
+
+        for future in as_completed(futures):
+            key, path, stat, partition = futures[future]
+            entry = {
+                **future.result(),
+                "path": path,
+                "partition": os.path.relpath(partition, store),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": file_sha256(path),
+                "ingested_at": time.time(),
+            }
+            previous = manifest.get(key, {}).get("partition")
+            if previous and previous != entry["partition"]:
+                shutil.rmtree(os.path.join(store, previous), ignore_errors=True)
+            if entry["status"] == "failed":
+                print(f"[!] {key}: {entry['error']}")
+            else:
+                print(f"[*] {key}: {len(entry['tables'])} table(s)")
+            manifest[key] = done[key] = entry
+            save_manifest(store, manifest)  # progress survives an interrupted run
+    return done
+
+
+def parse_source(value: str):
+    name, sep, directory = value.partition("=")
+    if not sep or not name or not directory:
+        raise argparse.ArgumentTypeError(f"expected NAME=DIRECTORY, got {value!r}")
+    return name, directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest downloaded Excel workbooks into a partitioned Parquet store.")
+    parser.add_argument("--source", type=parse_source, action="append",
+                        help=f"NAME=DIRECTORY to ingest (repeatable; default: {', '.join(f'{k}={v}' for k, v in DEFAULT_SOURCES.items())})")
+    parser.add_argument("-o", "--store", default=STORE_DIR, help="Parquet store directory")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="Re-ingest every workbook, even if unchanged")
+    args = parser.parse_args(argv)
+
+    sources = dict(args.source) if args.source else DEFAULT_SOURCES
+    done = ingest(sources, args.store, args.workers, args.force)
+    failed = [key for key, entry in done.items() if entry["status"] == "failed"]
+    print(f"[*] {len(done) - len(failed)} workbook(s) ingested, {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,36 @@
 # Source: HK Monetary Authority
 
+import argparse
 import os
 import pandas as pd
 import re
-import requests
-import uuid
+import sys
 import warnings
 
-BASE_ENDPOINT = "https://api.hkma.gov.hk/public/market-data-and-statistics/monthly-statistical-bulletin"
-warnings.simplefilter(action='ignore', category=FutureWarning)
+from incremental import append_new_rows, latest_date, read_existing, stable_ids
+from parquet_io import typed_frame, write_parquet
+from sources import Schema, Source, SourceClient, json_path, offset_pagination
 
-def get_data_note_bill(page=1, pagesize=200):
-    endpoint = f"{BASE_ENDPOINT}/efbn/efbn-yield-daily"
-    
-    query_params = {
-        "offset": (page-1) * pagesize,
-        "pagesize": pagesize,
-    }
-    
-    resp = requests.get(endpoint, params=query_params, timeout=15)
-    resp.raise_for_status()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    data = resp.json().get('result', {}).get('records', [])
-    df = drop_empty_columns(pd.DataFrame(data))
-    
-    return df
+from common.http_cache import add_cache_arguments, cache_from_args
 
-def get_data_bonds(page=1, pagesize=200):
-    endpoint = f"{BASE_ENDPOINT}/gov-bond/instit-bond-price-yield-daily"
-    
-    query_params = {
-        "segment": "OutstandYields",
-        "offset": (page-1) * pagesize,
-        "pagesize": pagesize,
-    }
-    
-    resp = requests.get(endpoint, params=query_params)
-    resp.raise_for_status()
+BASE_ENDPOINT = "https://api.hkma.gov.hk/public/market-data-and-statistics/monthly-statistical-bulletin"
+DATASET = "hkma/exchange_fund_fi"
+warnings.simplefilter(action='ignore', category=FutureWarning)
 
-    data = resp.json().get('result', {}).get('records', [])
-    df = pd.DataFrame(data)    
-    df.columns = [format_field(col) for col in df.columns]
+def date_filter(since):
+    # `from` is inclusive; rows on `since` itself are dropped when merging
+    return {"from": since} if since else {}
 
-    return df
-
-def crawl_resource(fetcher, total_pages=3, pagesize=200):
-    all_dfs = []
-    for p in range(1, total_pages + 1):
-        df = fetcher(page=p, pagesize=pagesize)
-        
-        df = df.loc[:, ~df.columns.duplicated()]
-        all_dfs.append(df)
-    return pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
+def crawl_resource(source, since=None, client=None, total_pages=None):
+    """
+    Fetches every page of an HKMA `source` (at most `total_pages`) concurrently over
+    one pooled session, stopping at the first short or empty page. With `since`
+    (YYYY-MM-DD) only records from that day on are requested.
+    """
+    client = client or SourceClient()
+    return client.fetch(source, date_filter(since), total_pages)
 
 def format_field(s):
     match = re.search(r'(\d+)gb(\d{4})', s.lower())
@@ -72,35 +51,81 @@ def convert_col_names(s):
     return re.sub(pattern, r"\1year_bond", s)
 
 
-def main():
-    output_file = os.path.join("./financial", "hk_exchange_fund_fi.csv")
-    if os.path.exists(output_file) and False:
-        df = pd.read_csv(output_file, index_col=0)
-    else:
-        df_notes = crawl_resource(get_data_note_bill, total_pages=10)
-        df_bonds = crawl_resource(get_data_bonds, total_pages=10)
-
-        combined_df = pd.DataFrame()
-        if not df_notes.empty and not df_bonds.empty:
-            combined_df = pd.merge(
-                df_notes,
-                df_bonds,
-                on="end_of_day",
-            )
-        elif not df_notes.empty:
-            combined_df = df_notes.copy()
-        elif not df_bonds.empty:
-            combined_df = df_bonds.copy()
-
-        df = combined_df.copy()
+def format_bond_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [format_field(col) for col in df.columns]
+    return df
 
+# The API reports only the size of each page (`datasize`), not a total.
+NOTES_BILLS = Source(
+    name="hkma_efbn_yield_daily",
+    endpoint=f"{BASE_ENDPOINT}/efbn/efbn-yield-daily",
+    pagination=offset_pagination(200),
+    records=json_path("result", "records"),
+    schema=Schema(date_columns=("end_of_day",)),
+    transform=drop_empty_columns,
+)
+BONDS = Source(
+    name="hkma_gov_bond_yield_daily",
+    endpoint=f"{BASE_ENDPOINT}/gov-bond/instit-bond-price-yield-daily",
+    pagination=offset_pagination(200),
+    records=json_path("result", "records"),
+    schema=Schema(date_columns=("end_of_day",)),
+    params={"segment": "OutstandYields"},
+    transform=format_bond_columns,
+)
+
+
+def main(incremental=False, cache=None):
+    """
+    Rebuilds the CSV, or with `incremental` fetches only the days after the
+    latest `end_of_day` already stored and appends them. Row ids are derived
+    from `end_of_day`, so they are the same in both modes. API responses go
+    through `cache` (a common.http_cache.ResponseCache) if given.
+    """
+    output_file = os.path.join("./financial", "hk_exchange_fund_fi.csv")
+    existing = read_existing(output_file) if incremental else None
+    since = latest_date(existing, "end_of_day")
+    if since:
+        print(f"[*] Fetching records after {since}")
+
+    client = SourceClient(cache=cache)
+    df_notes = crawl_resource(NOTES_BILLS, since, client)
+    df_bonds = crawl_resource(BONDS, since, client)
+
+    combined_df = pd.DataFrame()
+    if not df_notes.empty and not df_bonds.empty:
+        combined_df = pd.merge(
+            df_notes,
+            df_bonds,
+            on="end_of_day",
+        )
+    elif not df_notes.empty:
+        combined_df = df_notes.copy()
+    elif not df_bonds.empty:
+        combined_df = df_bonds.copy()
+
+    df = combined_df.copy()
     df.columns = [convert_col_names(col) for col in df.columns]
-    
-    df.reset_index(inplace=True)
-    df['id'] = [str(uuid.uuid4()) for _ in range(len(df))]
-    df.set_index('id', inplace=True)
-    
-    df.to_csv(output_file, index=True)
+
+    if since and not df.empty:
+        df = df[pd.to_datetime(df["end_of_day"]) > pd.Timestamp(since)]
+    print(f"[*] {len(df)} new rows")
+    if df.empty:
+        return
+
+    if existing is not None:
+        existing = existing.drop(columns=["id"], errors="ignore")
+    df = append_new_rows(existing, df, "end_of_day", ["end_of_day"])
+    df.insert(0, "id", stable_ids(df, DATASET, ["end_of_day"]))
+
+    df.to_csv(output_file, index=False)
+    # every column other than id and end_of_day is a yield
+    write_parquet(typed_frame(df, ["end_of_day"]), os.path.splitext(output_file)[0] + ".parquet")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Download HKMA Exchange Fund bill/note and government bond yields.")
+    parser.add_argument("--incremental", action="store_true", help="Append only days newer than the existing CSV")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    main(incremental=args.incremental, cache=cache_from_args(args))
@@ -0,0 +1,43 @@
+import os
+import uuid
+from typing import List, Optional
+
+import pandas as pd
+
+
+def stable_ids(df: pd.DataFrame, dataset: str, key: List[str]) -> pd.Series:
+    """
+    Deterministic row ids: a UUIDv5 of the dataset name and the row's natural key,
+    so the same observation keeps its id across runs.
+    """
+    names = df[key].astype(str).agg("/".join, axis=1)
+    return names.map(lambda name: str(uuid.uuid5(uuid.NAMESPACE_URL, f"{dataset}/{name}")))
+
+
+def read_existing(path: str) -> Optional[pd.DataFrame]:
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path)
+    return df if not df.empty else None
+
+
+def latest_date(df: Optional[pd.DataFrame], column: str) -> Optional[str]:
+    """Latest `column` value as YYYY-MM-DD, or None if there is no data yet."""
+    if df is None or column not in df.columns:
+        return None
+    latest = pd.to_datetime(df[column], errors="coerce").max()
+    return None if pd.isna(latest) else latest.strftime("%Y-%m-%d")
+
+
+def append_new_rows(existing: Optional[pd.DataFrame], new: pd.DataFrame, date_column: str, key: List[str]) -> pd.DataFrame:
+    """
+    `existing` plus the rows of `new`, newest first. A row of `new` replaces an
+    existing row with the same natural key.
+    """
+    if existing is None or existing.empty:
+        combined = new.copy()
+    else:
+        combined = pd.concat([existing, new], ignore_index=True)
+    combined[date_column] = pd.to_datetime(combined[date_column]).dt.strftime("%Y-%m-%d")
+    combined = combined.drop_duplicates(subset=key, keep="last")
+    return combined.sort_values(date_column, ascending=False, kind="stable").reset_index(drop=True)
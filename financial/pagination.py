@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+# fetch_page(page_number) -> (page data, number of records on the page, total records or None)
+PageFetcher = Callable[[int], Tuple[Any, int, Optional[int]]]
+
+
+def iter_pages(fetch_page: PageFetcher, pagesize: int, max_pages: Optional[int] = None, concurrency=4) -> Iterator[Any]:
+    """
+    Fetches page 1, then the remaining pages concurrently; yields the page data in
+    order as soon as each page (and all pages before it) has arrived.
+
+    If the first response reports the total record count, exactly the pages needed
+    are requested. Otherwise pages are requested `concurrency` at a time until a
+    page comes back short or empty; pages after it are discarded.
+    """
+    data, size, total = fetch_page(1)
+    if size == 0:
+        return
+    yield data
+    if size < pagesize or max_pages == 1:
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if total is not None:
+            last = -(-total // pagesize)
+            if max_pages is not None:
+                last = min(last, max_pages)
+            for data, size, _ in pool.map(fetch_page, range(2, last + 1)):
+                if size == 0:
+                    return
+                yield data
+            return
+
+        page = 2
+        while max_pages is None or page <= max_pages:
+            stop = page + concurrency
+            if max_pages is not None:
+                stop = min(stop, max_pages + 1)
+            wave = range(page, stop)
+            for data, size, _ in pool.map(fetch_page, wave):
+                if size == 0:
+                    return
+                yield data
+                if size < pagesize:
+                    return
+            page = wave.stop
+
+
+def fetch_all_pages(fetch_page: PageFetcher, pagesize: int, max_pages: Optional[int] = None, concurrency=4) -> List[Any]:
+    """All pages of `iter_pages`, in order."""
+    return list(iter_pages(fetch_page, pagesize, max_pages, concurrency))
@@ -0,0 +1,40 @@
+from typing import Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def typed_frame(df: pd.DataFrame, date_columns: Iterable[str], category_columns: Iterable[str] = (),
+                integer_columns: Iterable[str] = (), string_columns: Iterable[str] = ("id",)) -> pd.DataFrame:
+    """
+    Applies an explicit schema: dates become calendar dates, descriptors become
+    categoricals, integer columns nullable Int64, and every other column float64.
+    """
+    df = df.copy()
+    special = set(date_columns) | set(category_columns) | set(integer_columns) | set(string_columns)
+    for col in date_columns:
+        df[col] = pd.to_datetime(df[col]).dt.date
+    for col in category_columns:
+        df[col] = df[col].astype("category")
+    for col in integer_columns:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    for col in string_columns:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+    numeric = [col for col in df.columns if col not in special]
+    if numeric:
+        df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce").astype("float64")
+    return df
+
+
+def write_parquet(df: pd.DataFrame, path: str, required: Iterable[str] = ("id",)):
+    """
+    Writes a typed frame as Parquet. `required` columns are stored as non-nullable,
+    which BigQuery loads as REQUIRED.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    required = set(required)
+    schema = pa.schema([field.with_nullable(field.name not in required) for field in table.schema],
+                       metadata=table.schema.metadata)
+    pq.write_table(table.cast(schema), path, compression="zstd")
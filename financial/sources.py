@@ -0,0 +1,222 @@
+# Paginated JSON API sources for the financial feeds.
+#
+# A feed declares its endpoint, pagination style and schema; fetching (pooled,
+# concurrent, cached) and writing (streamed page by page) are shared:
+#
+#     HKMA_EFBN = Source(
+#         name="hkma_efbn_daily",
+#         endpoint=f"{HKMA_ENDPOINT}/efbn/efbn-yield-daily",
+#         pagination=offset_pagination(200),
+#         records=json_path("result", "records"),
+#         schema=Schema(date_columns=("end_of_day",)),
+#     )
+#
+#   python financial/sources.py us_treasury.SOURCE -o financial/avg_interest_rates.parquet
+
+import argparse
+import importlib
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pagination import iter_pages
+from parquet_io import typed_frame
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.http_cache import ResponseCache, add_cache_arguments, cache_from_args, fetch_json
+from common.session import build_session
+
+TIMEOUT = 15
+
+
+@dataclass(frozen=True)
+class Pagination:
+    """`style` is "offset" (index = first record) or "page" (index = 1-based page number)."""
+    style: str
+    index_param: str
+    size_param: str
+    pagesize: int
+
+    def params(self, page: int) -> Dict[str, int]:
+        index = (page - 1) * self.pagesize if self.style == "offset" else page
+        return {self.index_param: index, self.size_param: self.pagesize}
+
+
+def offset_pagination(pagesize=200, offset_param="offset", size_param="pagesize") -> Pagination:
+    return Pagination("offset", offset_param, size_param, pagesize)
+
+
+def page_pagination(pagesize=100, number_param="page[number]", size_param="page[size]") -> Pagination:
+    return Pagination("page", number_param, size_param, pagesize)
+
+
+@dataclass(frozen=True)
+class Schema:
+    """Column types applied to every page; columns not listed are float64 (see parquet_io.typed_frame)."""
+    date_columns: Tuple[str, ...] = ()
+    category_columns: Tuple[str, ...] = ()
+    integer_columns: Tuple[str, ...] = ()
+    string_columns: Tuple[str, ...] = ("id",)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        return typed_frame(df, self.date_columns, self.category_columns, self.integer_columns, self.string_columns)
+
+
+def json_path(*keys) -> Callable[[Any], Any]:
+    """Extractor for a nested value of a JSON payload, None if a key is missing."""
+    def extract(payload):
+        for key in keys:
+            if not isinstance(payload, dict):
+                return None
+            payload = payload.get(key)
+        return payload
+    return extract
+
+
+def _no_total(payload):
+    return None
+
+
+@dataclass(frozen=True)
+class Source:
+    """
+    A paginated JSON API. `records` extracts the page's records from a payload and
+    `total` the total record count, if the API reports one. `parse` (payload ->
+    DataFrame) replaces the default `pd.DataFrame(records)`, and `transform` is
+    applied to every page before the schema.
+    """
+    name: str
+    endpoint: str
+    pagination: Pagination
+    records: Callable[[Any], Optional[list]]
+    schema: Schema = Schema()
+    total: Callable[[Any], Optional[int]] = _no_total
+    params: Mapping[str, Any] = field(default_factory=dict)
+    parse: Optional[Callable[[Any], pd.DataFrame]] = None
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+
+    def frame(self, payload) -> pd.DataFrame:
+        df = self.parse(payload) if self.parse else pd.DataFrame(self.records(payload) or [])
+        df = df.loc[:, ~df.columns.duplicated()]
+        if self.transform is not None:
+            df = self.transform(df)
+        return self.schema.apply(df) if not df.empty else df
+
+
+class SourceClient:
+    """
+    Fetches sources over one pooled session, `concurrency` pages at a time.
+    Responses go through `cache` (a ResponseCache) if given.
+    """
+
+    def __init__(self, concurrency=4, cache: Optional[ResponseCache] = None, session=None, timeout=TIMEOUT):
+        self.concurrency = concurrency
+        self.cache = cache
+        self.session = session or build_session(concurrency, retries=3)
+        self.timeout = timeout
+
+    def get_json(self, url: str, params: Mapping) -> Any:
+        return fetch_json(self.session, url, params, self.cache, self.timeout)
+
+    def iter_payloads(self, source: Source, params: Optional[Mapping] = None, max_pages: Optional[int] = None) -> Iterator[Any]:
+        """Raw payload of each page, in page order, while later pages are still being fetched."""
+        def fetch_page(page):
+            payload = self.get_json(source.endpoint, {**source.params, **(params or {}), **source.pagination.params(page)})
+            return payload, len(source.records(payload) or []), source.total(payload)
+
+        return iter_pages(fetch_page, source.pagination.pagesize, max_pages, self.concurrency)
+
+    def iter_frames(self, source: Source, params: Optional[Mapping] = None, max_pages: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Typed DataFrame of each page, in page order."""
+        for payload in self.iter_payloads(source, params, max_pages):
+            yield source.frame(payload)
+
+    def fetch(self, source: Source, params: Optional[Mapping] = None, max_pages: Optional[int] = None) -> pd.DataFrame:
+        frames = list(self.iter_frames(source, params, max_pages))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def write(self, source: Source, path: str, params: Optional[Mapping] = None, max_pages: Optional[int] = None) -> int:
+        """Streams every page to `path` (CSV or Parquet by extension); returns the number of rows."""
+        with FrameWriter(path) as writer:
+            for df in self.iter_frames(source, params, max_pages):
+                writer.write(df)
+            return writer.rows
+
+
+class FrameWriter:
+    """
+    Appends DataFrames to a CSV or Parquet file page by page instead of holding
+    the whole dataset in memory. The first page fixes the columns; later pages are
+    aligned to them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self.rows = 0
+        self._columns = None
+        self._schema = None
+        self._writer = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        if self._columns is None:
+            self._columns = list(df.columns)
+        else:
+            extra = [col for col in df.columns if col not in self._columns]
+            if extra:
+                print(f"[!] {self.path}: dropping columns not on the first page: {extra}")
+            df = df.reindex(columns=self._columns)
+
+        if self.parquet:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+            self._writer.write_table(table.cast(self._schema))
+        else:
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+
+def load_source(spec: str) -> Source:
+    """`module.ATTR`, e.g. `us_treasury.SOURCE`, for a Source declared in a module of this folder."""
+    module, _, attr = spec.rpartition(".")
+    return getattr(importlib.import_module(module), attr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a paginated API source to CSV or Parquet.")
+    parser.add_argument("source", help="Source to fetch, as module.ATTR (e.g. us_treasury.SOURCE)")
+    parser.add_argument("-o", "--output", required=True, help="Output .csv or .parquet path")
+    parser.add_argument("--max-pages", type=int, help="Stop after this many pages")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages fetched at once")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    source = load_source(args.source)
+    rows = SourceClient(args.concurrency, cache_from_args(args)).write(source, args.output, max_pages=args.max_pages)
+    print(f"[*] {source.name}: {rows} rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
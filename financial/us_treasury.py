@@ -1,49 +1,131 @@
 # Source: US Fiscal Data
 
+import argparse
 import os
+import numpy as np
 import pandas as pd
-import requests
-import uuid
-
-def get_endpoint(page_num=1, page_size=100):
-    base_url = "https://api.fiscaldata.treasury.gov/services/api/fiscal_service/v2/accounting/od/avg_interest_rates"
-    
-    url = f"{base_url}?sort=-record_date&format=json&page[number]={page_num}&page[size]={page_size}"
-    
-    return url
-
-def get_data(url):
-    resp = requests.get(url)
-    resp.raise_for_status()
-    data = resp.json().get('data', [])
-    
-    df = pd.DataFrame(data)
-    numerical_cols = set(df.columns[3:])
-    for col in df.columns: 
-        if col in numerical_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        if col == 'record_date':
-            df[col] = pd.to_datetime(df[col])
-    
+import sys
+
+from incremental import append_new_rows, latest_date, read_existing, stable_ids
+from parquet_io import typed_frame, write_parquet
+from sources import Schema, Source, SourceClient, json_path, page_pagination
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.http_cache import add_cache_arguments, cache_from_args
+
+OUTPUT_FILE = "./financial/us_treasury_yield.csv"
+PARQUET_FILE = "./financial/us_treasury_yield.parquet"
+DATASET = "fiscaldata/avg_interest_rates"
+NATURAL_KEY = ["record_date", "security_type_desc", "security_desc"]
+CATEGORY_COLUMNS = ["security_type_desc", "security_desc"]
+INTEGER_COLUMNS = [
+    "src_line_nbr", "record_fiscal_year", "record_fiscal_quarter",
+    "record_calendar_year", "record_calendar_quarter", "record_calendar_month", "record_calendar_day",
+]
+
+# Fiscal Data `meta.dataTypes` values; anything else is kept as a string
+FLOAT_TYPES = {"NUMBER", "PERCENTAGE", "CURRENCY", "CURRENCY0", "CURRENCY3", "RATE"}
+INT_TYPES = {"INTEGER", "YEAR", "QUARTER", "MONTH", "DAY"}
+DATE_TYPES = {"DATE"}
+NULL_STRINGS = ["null", ""]
+
+def _to_float_block(columns):
+    """Converts same-length lists of numeric strings to float64 in one pass ("null" -> NaN)."""
+    block = np.array(columns, dtype=object)
+    block[pd.isna(block) | np.isin(block, NULL_STRINGS)] = "nan"
+    try:
+        return block.astype("float64")
+    except ValueError:
+        # a stray non-numeric value: fall back to per-column coercion
+        return np.array([pd.to_numeric(pd.Series(col), errors="coerce").to_numpy("float64") for col in block])
+
+def parse_records(records, data_types):
+    """
+    Builds a typed DataFrame from Fiscal Data records using the response's
+    `meta.dataTypes`: numeric columns are converted together as one float block,
+    integer-like columns become Int64 and DATE columns datetimes.
+    """
+    columns = list(records[0]) if records else list(data_types)
+    arrays = {col: [record.get(col) for record in records] for col in columns}
+
+    numeric = [col for col in columns if data_types.get(col) in FLOAT_TYPES | INT_TYPES]
+    if numeric and records:
+        block = _to_float_block([arrays[col] for col in numeric])
+        for col, values in zip(numeric, block):
+            arrays[col] = values
+    df = pd.DataFrame(arrays, columns=columns)
+
+    for col in columns:
+        kind = data_types.get(col)
+        if kind in INT_TYPES:
+            df[col] = df[col].astype("Int64")
+        elif kind in DATE_TYPES:
+            df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors="coerce")
     return df
 
-def crawl_pages(num_pages=3, page_size=100):
-    all_frames = []
-    
-    for p in range(1, num_pages + 1):
-        url = get_endpoint(page_num=p, page_size=page_size)
-        df = get_data(url)
-        if not df.empty:
-            all_frames.append(df)
-    
-    if all_frames:
-        return pd.concat(all_frames, ignore_index=True)
-    return pd.DataFrame()
+def parse_payload(payload):
+    return parse_records(payload.get('data', []), payload.get('meta', {}).get('dataTypes', {}))
 
-if __name__ == "__main__":
+SOURCE = Source(
+    name="fiscaldata_avg_interest_rates",
+    endpoint="https://api.fiscaldata.treasury.gov/services/api/fiscal_service/v2/accounting/od/avg_interest_rates",
+    pagination=page_pagination(100),
+    records=json_path("data"),
+    total=json_path("meta", "total-count"),
+    params={"sort": "-record_date", "format": "json"},
+    parse=parse_payload,
+    schema=Schema(date_columns=("record_date",), category_columns=tuple(CATEGORY_COLUMNS), integer_columns=tuple(INTEGER_COLUMNS)),
+)
+
+def since_filter(since):
+    return {"filter": f"record_date:gt:{since}"} if since else {}
+
+def crawl_pages(num_pages=3, since=None, client=None):
+    """
+    Fetches up to `num_pages` pages concurrently (the total count comes from the
+    first response) and parses all records once.
+    """
+    client = client or SourceClient()
+    data_types = {}
+    records = []
+    for payload in client.iter_payloads(SOURCE, since_filter(since), num_pages):
+        data_types.update(payload.get('meta', {}).get('dataTypes', {}))
+        records.extend(payload.get('data', []))
+    if not records:
+        return pd.DataFrame()
+    return parse_records(records, data_types)
+
+def main(incremental=False, cache=None):
+    """
+    Rebuilds the CSV, or with `incremental` fetches only records after the latest
+    `record_date` already stored and appends them. Row ids are derived from the
+    natural key, so they are the same in both modes. API responses go through
+    `cache` (a common.http_cache.ResponseCache) if given.
+    """
     os.makedirs('./financial', exist_ok=True)
-    df = crawl_pages(num_pages=20)
-    df['id'] = [str(uuid.uuid4()) for _ in range(len(df))]
-    df = df.set_index('id').reset_index() # this sets id as the 1st field
-    if not df.empty:
-        df.to_csv('./financial/us_treasury_yield.csv', index=False)
\ No newline at end of file
+    existing = read_existing(OUTPUT_FILE) if incremental else None
+    since = latest_date(existing, "record_date")
+    if since:
+        print(f"[*] Fetching records after {since}")
+
+    df = crawl_pages(num_pages=20, since=since, client=SourceClient(cache=cache))
+    print(f"[*] {len(df)} new rows")
+    if df.empty:
+        return
+
+    if existing is not None:
+        existing = existing.drop(columns=["id"], errors="ignore")
+    df = append_new_rows(existing, df, "record_date", NATURAL_KEY)
+    df.insert(0, "id", stable_ids(df, DATASET, NATURAL_KEY)) # this sets id as the 1st field
+    df.to_csv(OUTPUT_FILE, index=False)
+    typed = typed_frame(df, ["record_date"], CATEGORY_COLUMNS, INTEGER_COLUMNS)
+    write_parquet(typed, PARQUET_FILE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download US Treasury average interest rates.")
+    parser.add_argument("--incremental", action="store_true", help="Append only records newer than the existing CSV")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    main(incremental=args.incremental, cache=cache_from_args(args))
\ No newline at end of file
@@ -7,17 +7,20 @@ from urllib.parse import urljoin, unquote
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from insurers.download_file import download_file_from_url
+from insurers.crawl import manifest_entry
 
-def find_statements():
-    url = "https://www.aia.com/en/investor-relations/overview/results-presentations"
+URL = "https://www.aia.com/en/investor-relations/overview/results-presentations"
+
+def find_statements(session=None):
+    """Report entries (see insurers.crawl.manifest_entry) for the supplements and announcements on the results page."""
     kws = ['supplement', 'announcement']
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     }
+    reports = []
     
     try:
-        resp = requests.get(url, headers=headers)
+        resp = (session or requests).get(URL, headers=headers, timeout=30)
         resp.raise_for_status()
         
         soup = BeautifulSoup(resp.content, 'html.parser')
@@ -32,21 +35,22 @@ def find_statements():
                     if not link_text:
                         continue
                         
-                    link = urljoin(url, a['href'])
+                    link = urljoin(URL, a['href'])
                     
                     if any(kw in link_text.lower() for kw in kws):
                         filename = unquote(link.split('/')[-1])
-                        cur_wd = os.getcwd() + '/financial_statements/data'
-                        os.makedirs(cur_wd, exist_ok=True)
-                        download_file_from_url(link, f"{cur_wd}/{filename}")
+                        reports.append(manifest_entry("aia_group", link, URL, filename))
                         
     except requests.RequestException as e:
         print(f"Network error occurred: {e}")
     except Exception as e:
         print(f"An error occurred: {e}")
 
+    return reports
+
 def main():
-    find_statements()
+    from harvest import main as harvest
+    harvest(["--sources", "aia_group"])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
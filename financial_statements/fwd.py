@@ -1,17 +1,18 @@
 import re
-from playwright.sync_api import sync_playwright, Locator
 import sys
 import os
-from urllib.parse import urljoin, unquote
+from urllib.parse import urljoin
 
 # Add parent directory to path to import insurers module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from insurers.download_file import create_folder_if_not_exist, download_file_from_url
+from insurers.browser_pool import SITE_WAITS, dom_signature_sync, goto_sync, sync_page, wait_for_dom_change_sync
+from insurers.crawl import manifest_entry
 
 URL = "https://www.fwd.com/en/investors/results-and-reports/"
 
 def scan_page():
+    """Report entries (see insurers.crawl.manifest_entry) for every matching file once all result years are expanded."""
     kws = [
         'actuarial',
         'announcement',
@@ -20,27 +21,20 @@ def scan_page():
         'results presentation',
         'financial supplement',
     ]
+    reports = []
     
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            )
-            page = context.new_page()
-            
-            page.goto(URL, wait_until="networkidle", timeout=15000)
+        with sync_page() as page:
+            goto_sync(page, URL, SITE_WAITS["fwd_reports"])
             expand_buttons_locator = page.locator('div[role="button"]').filter(has_text=re.compile(r'^\s*\d+\s*$'))
             
             for i in range(expand_buttons_locator.count()):
+                before = dom_signature_sync(page, 'a[href]')
                 expand_buttons_locator.nth(i).click(force=True)
-                page.wait_for_timeout(1000)
+                wait_for_dom_change_sync(page, 'a[href]', before, timeout=3000)
             
             links = page.locator('a').all() 
             
-            save_dir = os.path.join(os.getcwd(), 'financial_statements', 'data')
-            create_folder_if_not_exist(save_dir)
-            
             for link in links: 
                 href = link.get_attribute('href')
                 inner = link.inner_text().lower().strip()
@@ -50,17 +44,16 @@ def scan_page():
                     continue # check keyword
                     
                 filename = href.strip().split('/')[-1].replace('_Group_Holdings_Limited', '')
-                dest_path = os.path.join(save_dir, filename)
-                download_file_from_url(urljoin(URL, href), dest_path)
-                # print("Found:", filename)
-            
-            browser.close()
+                reports.append(manifest_entry("fwd", urljoin(URL, href), URL, filename))
             
     except Exception as e:
         print(f"[!] An error occurred: {e}")
 
+    return reports
+
 def main():
-    scan_page()
+    from harvest import main as harvest
+    harvest(["--sources", "fwd"])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+# Financial statements of AIA Group, FWD and Manulife in one run.
+#
+#   python financial_statements/harvest.py [--sources aia_group fwd manulife] [--workers 8] [-o manifest.json]
+#
+# Link discovery for every source runs concurrently (each in its own thread: the
+# FWD page needs a browser, AIA and Manulife are plain HTTP). Reports are handed
+# to one shared download pool as soon as their source is scanned, and the result
+# is a `{"reports": [...]}` manifest that `upload_helper upload-json` can upload.
+# Reports already downloaded are revalidated against a download index (ETag /
+# Last-Modified / size / hash per URL): servers that send validators answer a rerun
+# with 304s, the others are downloaded again and kept only if their hash changed.
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+import aia_group
+import fwd
+import manulife
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.download_index import DOWNLOADED, FAILED, UNCHANGED, DownloadIndex, download
+from common.session import impersonated_session
+
+SOURCES = {
+    "aia_group": (aia_group.find_statements, "financial_statements/data"),
+    "fwd": (fwd.scan_page, "financial_statements/data"),
+    "manulife": (manulife.find_reports, "financial_statements/reports"),
+}
+DOWNLOAD_WORKERS = 8
+DEFAULT_MANIFEST = "financial_statements/manifest.json"
+INDEX_FILE = "financial_statements/.download_index.json"
+# anything but the HTML error / challenge pages some sites return with status 200
+REPORT_CONTENT_TYPES = ("pdf", "excel", "spreadsheet", "officedocument", "octet-stream")
+ACCEPT = "application/pdf, application/vnd.ms-excel, application/vnd.openxmlformats-officedocument.spreadsheetml.sheet, */*;q=0.8"
+
+
+def harvest(sources=tuple(SOURCES), workers=DOWNLOAD_WORKERS, download_files=True, index_path=INDEX_FILE, force=False):
+    """
+    Discovers the reports of `sources` concurrently and downloads them over one
+    pooled session, `workers` at a time, while slower sources are still being
+    scanned. Returns the per-source summary and the report entries (deduplicated by
+    URL, in discovery order), each with its local `path` and download `status`.
+    Unchanged reports in the index at `index_path` are skipped unless `force`.
+    """
+    reports: List[dict] = []
+    summary: Dict[str, dict] = {}
+    seen = set()
+    session = impersonated_session({"Accept": ACCEPT})
+    index = DownloadIndex(index_path)
+
+    def fetch(entry):
+        entry["status"] = download(session, entry["source_url"], entry["path"], index,
+                                   conditional=not force, content_types=REPORT_CONTENT_TYPES)
+        if entry["status"] == DOWNLOADED:
+            print(f"[*] Saved {entry['path']}")
+        elif entry["status"] == UNCHANGED:
+            print(f"[~] Unchanged: {entry['path']}")
+        return entry
+
+    with ThreadPoolExecutor(max_workers=len(sources)) as discovery, ThreadPoolExecutor(max_workers=workers) as downloads:
+        started = {source: time.monotonic() for source in sources}
+        scans = {discovery.submit(SOURCES[source][0]): source for source in sources}
+        pending = []
+        for future in as_completed(scans):
+            source = scans[future]
+            save_dir = SOURCES[source][1]
+            try:
+                found = future.result()
+            except Exception as e:
+                print(f"[!] {source} discovery failed: {e}")
+                summary[source] = {"status": "error", "error": str(e)}
+                continue
+
+            new = [entry for entry in found if entry["source_url"] not in seen]
+            seen.update(entry["source_url"] for entry in new)
+            summary[source] = {"status": "ok", "reports": len(new), "seconds": round(time.monotonic() - started[source], 1)}
+            print(f"[*] {source}: {len(new)} reports found")
+
+            os.makedirs(save_dir, exist_ok=True)
+            for entry in new:
+                entry["path"] = os.path.join(save_dir, entry["filename"])
+                reports.append(entry)
+                if download_files:
+                    pending.append(downloads.submit(fetch, entry))
+
+        for future in pending:
+            future.result()
+    session.close()
+    index.save()
+
+    if download_files:
+        for source in (source for source, s in summary.items() if s["status"] == "ok"):
+            statuses = [entry["status"] for entry in reports if entry["insurer"] == source]
+            for status in (DOWNLOADED, UNCHANGED, FAILED):
+                summary[source][status] = statuses.count(status)
+    return summary, reports
+
+
+def write_manifest(entries: List[dict], path: str):
+    """Writes `{"reports": [...]}`, the layout `upload_helper upload-json` reads."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"reports": entries}, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harvest AIA Group, FWD and Manulife financial statements concurrently.")
+    parser.add_argument("--sources", nargs="+", choices=list(SOURCES), default=list(SOURCES), help="Sources to scan")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Downloads in flight")
+    parser.add_argument("--no-download", action="store_true", help="Only discover reports, build the manifest")
+    parser.add_argument("--force", action="store_true", help="Download every report, even if unchanged")
+    parser.add_argument("-o", "--output", default=DEFAULT_MANIFEST, help="Manifest path")
+    args = parser.parse_args(argv)
+
+    summary, reports = harvest(args.sources, args.workers, not args.no_download, force=args.force)
+    write_manifest(reports, args.output)
+    print(f"[*] {len(reports)} reports written to {args.output}")
+    print(json.dumps(summary, indent=2))
+    return 0 if all(s["status"] == "ok" for s in summary.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
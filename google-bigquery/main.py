@@ -38,12 +38,35 @@ def transform_schema(client: Client, full_table_id: str)-> List[SchemaField]:
         return []
 
 
+def load_parquet(client: Client, table_ref, path: str):
+    """
+    Loads a typed Parquet file written by the financial scripts. Column types
+    (DATE, FLOAT64, INT64, REQUIRED id) come from the file, so no schema patching
+    or header skipping is needed.
+    """
+    job_config = LoadJobConfig(
+        source_format=SourceFormat.PARQUET,
+        write_disposition=WriteDisposition.WRITE_TRUNCATE,
+    )
+    with open(path, "rb") as f:
+        load_job = client.load_table_from_file(f, table_ref, job_config=job_config)
+        load_job.result()
+
+
 def main():
     cli = Client(project=PROJECT_ID)
     dataset_ref = cli.dataset(DATASET_ID)
     tables: List[TableListItem] = list(cli.list_tables(dataset_ref))
 
     for table in tables:
+        parquet_path = f"{SOURCE_DATA_DIR}/{table.table_id}.parquet"
+        if os.path.exists(parquet_path):
+            try:
+                load_parquet(cli, dataset_ref.table(table.table_id), parquet_path)
+            except Exception as e:
+                print(e)
+            continue
+
         new_schema = transform_schema(cli, table)
         if not new_schema:
             continue
@@ -1,36 +1,252 @@
+# Batched import of GCS files into a Vertex AI Search data store.
+#
+#   python google-vertexai/datastore_import.py [firecrawl/target.txt] --datastore ID [--project ID]
+#   python google-vertexai/datastore_import.py gs_uris.txt --schema document   # JSONL from pdf_documents.py
+#
+# Object sizes are looked up in GCS first, so files over the per-file limit are
+# reported instead of sent. The rest are split into batches within the API
+# limits, up to --max-concurrent import operations run at once and are polled
+# asynchronously, and per-document errors are collected. URIs that failed are written to
+# --failed-output, which can be passed back in as the URI list to retry them.
+# --delete-ids removes documents by id first (e.g. the <output>.deleted.txt list
+# from pdf_documents.py); ids that could not be deleted are written back to it.
+# Project, location and data store come from the CLI or the environment
+# (VERTEX_PROJECT_ID, VERTEX_DATASTORE_LOCATION, VERTEX_DATASTORE_ID, or a full
+# VERTEX_DATASTORE_PATH).
+
+import argparse
+import asyncio
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
 from google.cloud import discoveryengine
 
-project_id = "project-b8819359-0bf9-4214-88d"
-location = "global"
-data_store_id = "hku-market-analysis_1769864742906"
+DEFAULT_LOCATION = "global"
+URIS_FILE = "firecrawl/target.txt"
+FAILED_FILE = "firecrawl/failed_uris.txt"
 
-def import_from_gcs(uri):
-    cli = discoveryengine.DocumentServiceClient()
-    
-    parent = cli.branch_path(
-        project=project_id,
-        location=location,
-        data_store=data_store_id,
-        branch="default_branch",
-    )
-    
+# GcsSource limits per import request: files, and bytes per file
+MAX_FILES = {"content": 100_000, "document": 100}
+MAX_FILE_BYTES = {"content": 100 * 1024 ** 2, "document": 2 * 1024 ** 3}
+DEFAULT_BATCH_SIZE = 500  # smaller than the limit so batches run in parallel and a failure stays contained
+MAX_CONCURRENT = 4  # concurrent import operations per data store are quota-limited
+URI_RE = re.compile(r"gs://[^\s'\"),]+")
+DATASTORE_PATH_RE = re.compile(r"projects/(?P<project>[^/]+)/locations/(?P<location>[^/]+)/(?:collections/[^/]+/)?dataStores/(?P<datastore>[^/]+)")
+
+
+def datastore_settings(project=None, location=None, datastore=None):
+    """(project, location, data store) from the arguments, falling back to the environment."""
+    path = DATASTORE_PATH_RE.search(os.getenv("VERTEX_DATASTORE_PATH", ""))
+    from_path = path.groupdict() if path else {}
+    project = project or os.getenv("VERTEX_PROJECT_ID", "").strip() or from_path.get("project")
+    location = location or os.getenv("VERTEX_DATASTORE_LOCATION", "").strip() or from_path.get("location") or DEFAULT_LOCATION
+    datastore = datastore or os.getenv("VERTEX_DATASTORE_ID", "").strip() or from_path.get("datastore")
+    if not project or not datastore:
+        raise RuntimeError("Set --project/--datastore or VERTEX_PROJECT_ID/VERTEX_DATASTORE_ID (or VERTEX_DATASTORE_PATH)")
+    return project, location, datastore
+
+
+def read_uris(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return sorted(set(line.strip() for line in f if line.strip()))  # cleaning
+
+
+def blob_sizes(uris: Sequence[str], workers=16) -> Dict[str, Optional[int]]:
+    """Object sizes in bytes; None for wildcard URIs and objects that could not be read."""
+    from google.cloud import storage
+
+    client = storage.Client()
+
+    def size(uri):
+        bucket, _, name = uri[len("gs://"):].partition("/")
+        if "*" in uri or not name:
+            return uri, None
+        try:
+            blob = client.bucket(bucket).get_blob(name)
+        except Exception as e:
+            print(f"[!] {uri}: {e}")
+            return uri, None
+        return uri, blob.size if blob is not None else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(size, uris))
+
+
+def make_batches(uris: Sequence[str], max_files: int, max_bytes: Optional[int] = None,
+                 sizes: Optional[Dict[str, Optional[int]]] = None) -> List[List[str]]:
+    """Consecutive batches of at most `max_files` URIs and, with `sizes`, at most `max_bytes` in total."""
+    batches, batch, total = [], [], 0
+    for uri in uris:
+        size = (sizes or {}).get(uri) or 0
+        if batch and (len(batch) >= max_files or (max_bytes and total + size > max_bytes)):
+            batches.append(batch)
+            batch, total = [], 0
+        batch.append(uri)
+        total += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def failed_uris(batch: Sequence[str], errors: Sequence[str], failure_count: int) -> List[str]:
+    """
+    URIs of a batch named in its error samples. Error samples are capped, so if
+    they cannot account for every failure the whole batch is returned (imports are
+    incremental, so retrying documents that did import is harmless).
+    """
+    in_batch = set(batch)
+    # "gs://b/x.pdf: bad" - punctuation after a URI is not part of it
+    mentioned = {uri.rstrip(".:;") for message in errors for uri in URI_RE.findall(message)}
+    named = sorted(mentioned & in_batch)
+    return named if len(named) >= failure_count else list(batch)
+
+
+async def import_batch(client, parent: str, batch: List[str], schema: str, semaphore: asyncio.Semaphore,
+                       number: int, error_prefix: Optional[str] = None) -> dict:
+    """Runs one import operation and returns its counts, error samples and failed URIs."""
     request = discoveryengine.ImportDocumentsRequest(
         parent=parent,
-        gcs_source=discoveryengine.GcsSource(
-            input_uris=uri,
-            data_schema="content",
-        ),
+        gcs_source=discoveryengine.GcsSource(input_uris=batch, data_schema=schema),
         reconciliation_mode=discoveryengine.ImportDocumentsRequest.ReconciliationMode.INCREMENTAL,
     )
-    
-    operation = cli.import_documents(request=request)
-    response = operation.result()
-    print(response)
-    
-if __name__=="__main__": 
-    uris = None
-    with open("firecrawl/target.txt", "r") as f:
-        uris = f.readlines()
-    if uris is not None:
-        uris = sorted(set(uri.strip() for uri in uris)) # cleaning
-        import_from_gcs(uris)
\ No newline at end of file
+    if error_prefix:
+        request.error_config = discoveryengine.ImportErrorConfig(gcs_prefix=f"{error_prefix.rstrip('/')}/batch-{number:04d}/")
+
+    async with semaphore:
+        try:
+            operation = await client.import_documents(request=request)
+            print(f"[*] Batch {number}: {len(batch)} URIs, operation {operation.operation.name}")
+            response = await operation.result()
+        except Exception as e:
+            print(f"[!] Batch {number} failed: {e}")
+            return {"batch": number, "uris": len(batch), "success": 0, "failure": len(batch),
+                    "errors": [str(e)], "failed_uris": list(batch)}
+
+    metadata = operation.metadata
+    errors = [status.message for status in response.error_samples]
+    failure = metadata.failure_count if metadata is not None else len(errors)
+    success = metadata.success_count if metadata is not None else len(batch) - failure
+    print(f"[*] Batch {number}: {success} imported, {failure} failed")
+    return {"batch": number, "uris": len(batch), "success": success, "failure": failure, "errors": errors,
+            "failed_uris": failed_uris(batch, errors, failure) if failure else []}
+
+
+async def import_batches(batches: List[List[str]], parent: str, schema="content", max_concurrent=MAX_CONCURRENT,
+                         error_prefix: Optional[str] = None, client=None) -> List[dict]:
+    client = client or discoveryengine.DocumentServiceAsyncClient()
+    semaphore = asyncio.Semaphore(max_concurrent)
+    return await asyncio.gather(*(
+        import_batch(client, parent, batch, schema, semaphore, number, error_prefix)
+        for number, batch in enumerate(batches, start=1)
+    ))
+
+
+async def delete_documents(ids: Sequence[str], parent: str, max_concurrent=MAX_CONCURRENT, client=None) -> List[str]:
+    """Deletes documents of the branch `parent` by id; returns the ids that could not be deleted."""
+    from google.api_core.exceptions import NotFound
+
+    client = client or discoveryengine.DocumentServiceAsyncClient()
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def delete(doc_id):
+        async with semaphore:
+            try:
+                await client.delete_document(name=f"{parent}/documents/{doc_id}")
+            except NotFound:
+                pass
+            except Exception as e:
+                print(f"[!] Could not delete {doc_id}: {e}")
+                return doc_id
+        return None
+
+    return [doc_id for doc_id in await asyncio.gather(*(delete(doc_id) for doc_id in ids)) if doc_id]
+
+
+def branch_path(project=None, location=None, datastore=None) -> str:
+    project, location, datastore = datastore_settings(project, location, datastore)
+    return discoveryengine.DocumentServiceClient.branch_path(
+        project=project,
+        location=location,
+        data_store=datastore,
+        branch="default_branch",
+    )
+
+
+def import_from_gcs(uris, project=None, location=None, datastore=None, schema="content",
+                    batch_size=DEFAULT_BATCH_SIZE, max_batch_bytes=None, max_concurrent=MAX_CONCURRENT,
+                    error_prefix=None) -> dict:
+    """
+    Imports `uris` in batches (see module comment). Files over the per-file limit
+    are not sent and count as failed. Returns the aggregated summary with every
+    failed URI under "failed_uris".
+    """
+    datastore = datastore_settings(project, location, datastore)[2]
+    parent = branch_path(project, location, datastore)
+
+    uris = list(uris)
+    sizes = blob_sizes(uris)  # needed for the per-file limit, and for `max_batch_bytes` if set
+    too_large = [uri for uri in uris if (sizes.get(uri) or 0) > MAX_FILE_BYTES[schema]]
+    for uri in too_large:
+        print(f"[-] Over the {MAX_FILE_BYTES[schema] // 1024 ** 2} MB limit: {uri}")
+    skipped = set(too_large)
+    to_import = [uri for uri in uris if uri not in skipped]
+
+    batches = make_batches(to_import, min(batch_size, MAX_FILES[schema]), max_batch_bytes, sizes)
+    print(f"[*] Importing {len(to_import)} URIs into {datastore} in {len(batches)} batch(es), {max_concurrent} at a time")
+    results = asyncio.run(import_batches(batches, parent, schema, max_concurrent, error_prefix))
+
+    return {
+        "batches": len(results),
+        "success": sum(r["success"] for r in results),
+        "failure": sum(r["failure"] for r in results) + len(too_large),
+        "failed_batches": [r["batch"] for r in results if r["failure"]],
+        "errors": [error for r in results for error in r["errors"]],
+        "failed_uris": too_large + [uri for r in results for uri in r["failed_uris"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import GCS files into a Vertex AI Search data store in concurrent batches.")
+    parser.add_argument("uris_file", nargs="?", default=URIS_FILE, help="File with one gs:// URI per line")
+    parser.add_argument("--project", help="GCP project (default: $VERTEX_PROJECT_ID)")
+    parser.add_argument("--location", help=f"Data store location (default: $VERTEX_DATASTORE_LOCATION or {DEFAULT_LOCATION})")
+    parser.add_argument("--datastore", help="Data store id (default: $VERTEX_DATASTORE_ID)")
+    parser.add_argument("--schema", choices=sorted(MAX_FILES), default="content",
+                        help="content: raw files (PDF, HTML...); document: JSONL documents")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="URIs per import operation (capped at the API limit)")
+    parser.add_argument("--max-batch-mb", type=float, help="Also bound each batch by total object size")
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT, help="Import operations running at once")
+    parser.add_argument("--error-prefix", help="gs:// prefix where Vertex writes the full error logs")
+    parser.add_argument("--failed-output", default=FAILED_FILE, help="Where failed URIs are written for a retry")
+    parser.add_argument("--delete-ids", help="File with one document id per line to delete before importing")
+    args = parser.parse_args()
+
+    if args.delete_ids:
+        ids = read_uris(args.delete_ids)
+        parent = branch_path(args.project, args.location, args.datastore)
+        remaining = asyncio.run(delete_documents(ids, parent, args.max_concurrent))
+        with open(args.delete_ids, "w", encoding="utf-8") as f:
+            f.writelines(f"{doc_id}\n" for doc_id in remaining)
+        print(f"[*] Deleted {len(ids) - len(remaining)} of {len(ids)} documents")
+
+    uris = read_uris(args.uris_file)
+    max_batch_bytes = int(args.max_batch_mb * 1024 ** 2) if args.max_batch_mb else None
+    summary = import_from_gcs(uris, args.project, args.location, args.datastore, args.schema,
+                              args.batch_size, max_batch_bytes, args.max_concurrent, args.error_prefix)
+
+    failed = summary.pop("failed_uris")
+    if failed:
+        os.makedirs(os.path.dirname(args.failed_output) or ".", exist_ok=True)
+        with open(args.failed_output, "w", encoding="utf-8") as f:
+            f.writelines(f"{uri}\n" for uri in failed)
+        print(f"[!] {len(failed)} URIs failed, written to {args.failed_output}")
+    summary["errors"] = summary["errors"][:20]
+    print(json.dumps(summary, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,297 @@
+# Local text extraction for Vertex AI Search.
+#
+#   python google-vertexai/pdf_documents.py [DIR ...] [-o data/vertex/documents.jsonl] [--workers 4]
+#
+# Extracts the text of the downloaded brochures and reports with PyPDF2 in a
+# process pool and writes one Vertex document per chunk (JSONL, import with
+# data_schema="document"). Chunks carry their page range, and the text marks each
+# page with a "[page N]" anchor so answers can cite it. Extracted pages are cached
+# by the PDF's SHA-256, so unchanged PDFs are never parsed twice, and copies of one
+# PDF (same content under several paths or names) become one set of documents.
+#
+# Document ids derive from the PDF's source URL (or path) and chunk number, so a
+# new version of a brochure overwrites its old chunks on an incremental import.
+# Chunk counts per source are kept in <output>.ids.json; ids that no longer exist
+# (a brochure that shrank or disappeared) are listed in <output>.deleted.txt for
+# `datastore_import.py --delete-ids`.
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PyPDF2 import PdfReader
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insurers.crawl import CACHE_DIR
+
+DEFAULT_DIRS = ("brochures", "financial_statements/data", "financial_statements/reports")
+# discovery manifests whose entries (insurer, source_url, ...) become document metadata
+MANIFESTS = ("brochures/manifest.json", "financial_statements/manifest.json")
+OUTPUT_FILE = "data/vertex/documents.jsonl"
+TEXT_CACHE_DIR = os.path.join(CACHE_DIR, "pdf-text")
+CHUNK_CHARS = 4000  # well under the per-document content limit, small enough to ground on
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_pages(path: str) -> List[str]:
+    """Text of every page, whitespace-normalised; pages PyPDF2 cannot read are left empty."""
+    reader = PdfReader(path)
+    pages = []
+    for page in reader.pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        pages.append("\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip()))
+    return pages
+
+
+def _cache_path(sha256: str) -> str:
+    return os.path.join(TEXT_CACHE_DIR, sha256[:2], f"{sha256}.json.gz")
+
+
+def cached_pages(sha256: str) -> Optional[List[str]]:
+    try:
+        with gzip.open(_cache_path(sha256), "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_pages(sha256: str, pages: List[str]):
+    path = _cache_path(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as f:
+        json.dump(pages, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def chunk_pages(pages: List[str], max_chars=CHUNK_CHARS) -> Iterator[Tuple[int, int, str]]:
+    """
+    (first page, last page, text) chunks of at most `max_chars`, 1-based pages.
+    Chunks break between pages where possible; a page longer than `max_chars` is
+    split on line boundaries, and a line longer than that is cut. Every piece
+    starts with its "[page N]" anchor.
+    """
+    start, last, parts, size = None, None, [], 0
+    for number, text in enumerate(pages, start=1):
+        if not text:
+            continue
+        limit = max(max_chars - len(f"[page {number}]\n"), 1)
+        pieces, piece = [], ""
+        for line in text.split("\n"):
+            for cut in range(0, max(len(line), 1), limit):
+                segment = line[cut:cut + limit]
+                if piece and len(piece) + len(segment) + 1 > limit:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece}\n{segment}" if piece else segment
+        pieces.append(piece)
+
+        for piece in pieces:
+            anchored = f"[page {number}]\n{piece}"
+            if parts and size + len(anchored) > max_chars:
+                yield start, last, "\n\n".join(parts)
+                parts, size = [], 0
+            if not parts:
+                start = number
+            parts.append(anchored)
+            size += len(anchored) + 2
+            last = number
+    if parts:
+        yield start, last, "\n\n".join(parts)
+
+
+def find_pdfs(dirs) -> List[str]:
+    paths = []
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return sorted(set(paths))
+
+
+def load_metadata(manifests=MANIFESTS) -> Dict[str, dict]:
+    """Manifest entries keyed by local path (reports) and by filename (brochures)."""
+    metadata = {}
+    for path in manifests:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for entry in data.get("reports") or data.get("brochures") or []:
+            if entry.get("filename"):
+                metadata.setdefault(entry["filename"], entry)
+            if entry.get("path"):
+                metadata[os.path.normpath(entry["path"])] = entry
+    return metadata
+
+
+def merge_metadata(paths: List[str], metadata: Dict[str, dict]) -> dict:
+    """One metadata entry for copies of a PDF: the first insurer and source URL, plus every filename and source URL."""
+    entries = [metadata.get(os.path.normpath(path)) or metadata.get(os.path.basename(path)) or {} for path in paths]
+    source_urls = list(dict.fromkeys(entry["source_url"] for entry in entries if entry.get("source_url")))
+    return {
+        "insurer": next((entry["insurer"] for entry in entries if entry.get("insurer")), ""),
+        "source_url": source_urls[0] if source_urls else "",
+        "source_urls": source_urls,
+        "filenames": list(dict.fromkeys(os.path.basename(path) for path in paths)),
+    }
+
+
+def document_key(path: str, entry: dict) -> str:
+    """Id prefix of a PDF's documents: a hash of its source URL, or of its path if it has none."""
+    source = entry.get("source_url") or os.path.normpath(path)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:40]
+
+
+def document_id(key: str, chunk: int) -> str:
+    return f"{key}-{chunk:04d}"
+
+
+def documents(path: str, sha256: str, pages: List[str], entry: Optional[dict] = None,
+              key: Optional[str] = None) -> Iterator[dict]:
+    """Vertex AI Search documents (one per chunk) for one PDF; ids are stable per source (see `document_key`)."""
+    entry = entry or {}
+    key = key or document_key(path, entry)
+    for i, (first, last, text) in enumerate(chunk_pages(pages)):
+        yield {
+            "id": document_id(key, i),
+            "structData": {
+                "title": os.path.splitext(os.path.basename(path))[0],
+                "filename": os.path.basename(path),
+                "insurer": entry.get("insurer", ""),
+                "source_url": entry.get("source_url", ""),
+                "source_urls": entry.get("source_urls", []),
+                "filenames": entry.get("filenames", [os.path.basename(path)]),
+                "page_start": first,
+                "page_end": last,
+                "chunk": i,
+                "sha256": sha256,
+            },
+            "content": {
+                "mimeType": "text/plain",
+                "rawBytes": base64.b64encode(text.encode("utf-8")).decode("ascii"),
+            },
+        }
+
+
+def load_chunk_counts(path: str) -> Dict[str, int]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_deleted_ids(path: str, previous: Dict[str, int], current: Dict[str, int]) -> int:
+    """
+    Adds the ids of `previous` that `current` no longer has to the list at `path`
+    (ids listed there and written again are dropped). Returns the number listed.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            deleted = {line.strip() for line in f if line.strip()}
+    except OSError:
+        deleted = set()
+    for key, count in previous.items():
+        deleted.update(document_id(key, i) for i in range(current.get(key, 0), count))
+    deleted -= {document_id(key, i) for key, count in current.items() for i in range(count)}
+    if deleted or os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{doc_id}\n" for doc_id in sorted(deleted))
+    return len(deleted)
+
+
+def build_documents(dirs=DEFAULT_DIRS, output=OUTPUT_FILE, workers=None):
+    """
+    Writes the JSONL documents of every PDF under `dirs` to `output`. Copies with
+    the same hash are written once, with their metadata merged. Only PDFs whose
+    hash is not in the text cache are parsed, `workers` processes at a time.
+    Ids dropped since the last run are added to <output>.deleted.txt; a PDF that
+    failed to parse keeps its previous ids.
+    Returns (PDFs, parsed, failed, documents written).
+    """
+    metadata = load_metadata()
+    copies: Dict[str, List[str]] = {}
+    for path in find_pdfs(dirs):
+        copies.setdefault(file_sha256(path), []).append(path)
+    hashes = {group[0]: sha256 for sha256, group in copies.items()}
+    paths = list(hashes)
+    total = sum(len(group) for group in copies.values())
+    if total > len(paths):
+        print(f"[~] {total - len(paths)} duplicate PDFs merged into their first copy")
+    pages = {path: cached_pages(sha256) for path, sha256 in hashes.items()}
+    missing = [path for path, cached in pages.items() if cached is None]
+    print(f"[*] {len(paths)} unique PDFs, {len(paths) - len(missing)} cached, {len(missing)} to extract")
+
+    failed = 0
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(extract_pages, path): path for path in missing}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    pages[path] = future.result()
+                except Exception as e:
+                    print(f"[!] {path}: {e}")
+                    failed += 1
+                    continue
+                store_pages(hashes[path], pages[path])
+
+    base = os.path.splitext(output)[0]
+    previous = load_chunk_counts(f"{base}.ids.json")
+    counts: Dict[str, int] = {}
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    written = 0
+    with open(output, "w", encoding="utf-8") as f:
+        for path in paths:
+            entry = merge_metadata(copies[hashes[path]], metadata)
+            key = document_key(path, entry)
+            if key in counts:  # another version of the same source on disk: keep both apart
+                key = document_key(path, {})
+            if pages.get(path) is None:
+                if key in previous:
+                    counts[key] = previous[key]
+                continue
+            counts[key] = 0
+            for document in documents(path, hashes[path], pages[path], entry, key):
+                f.write(json.dumps(document, ensure_ascii=False) + "\n")
+                counts[key] += 1
+                written += 1
+
+    with open(f"{base}.ids.json", "w", encoding="utf-8") as f:
+        json.dump(counts, f, indent=2, sort_keys=True)
+    deleted = update_deleted_ids(f"{base}.deleted.txt", previous, counts)
+    if deleted:
+        print(f"[~] {deleted} document ids no longer exist, listed in {base}.deleted.txt")
+    return total, len(missing) - failed, failed, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract PDF text into Vertex AI Search JSONL documents.")
+    parser.add_argument("dirs", nargs="*", default=list(DEFAULT_DIRS), help="Directories searched for PDFs")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE, help="JSONL output path")
+    parser.add_argument("--workers", type=int, help="Extraction processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    total, parsed, failed, written = build_documents(args.dirs, args.output, args.workers)
+    print(f"[*] {total} PDFs ({parsed} parsed, {failed} failed): {written} documents written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
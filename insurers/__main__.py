@@ -0,0 +1,3 @@
+from insurers.orchestrator import main
+
+raise SystemExit(main())
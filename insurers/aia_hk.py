@@ -1,11 +1,19 @@
+import asyncio
 import os
+from contextlib import AsyncExitStack
 from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-
+from insurers.browser_pool import SITE_WAITS, BrowserPool
+from insurers.crawl import crawl_state, manifest_entry
 from insurers.download_file import download_file_from_url
+from insurers.fetch import Fetcher
+
+PRODUCT_LIST_CLASS = 'cmp-hkproductfilterlist__productcard'
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
 
 def find_aia_major_categories():
     base_url = "https://www.aia.com.hk/en/"
@@ -33,66 +41,138 @@ def find_aia_major_categories():
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {e}")
         return []
-    
-def scrape_dynamic_products(root_url):
-    # this is a recursive formula, if the target_url contains the brochure of we want, we download it.
-    # else, check if we are currently in a list view of products.
-    PRODUCT_LIST_CLASS = 'cmp-hkproductfilterlist__productcard'
-    visited = set()
-
-    def dfs(current_url, page):
-        if current_url in visited:
-            return
-        visited.add(current_url)
-
-        try:
-            page.goto(current_url, wait_until="load", timeout=30000)
-            soup = BeautifulSoup(page.content(), 'html.parser') 
-        except Exception as e:
-            print(f"[!] Failed to load {current_url}: {e}")
-            return
-        
-        product_divs = soup.find_all('div', class_=PRODUCT_LIST_CLASS)
-        if product_divs:
-            print(f"Current page: {current_url}, found {len(product_divs)} products")
-            next_batch = []
-            for div in product_divs:
-                a_tag = div.find_parent('a', href=True)
-                if a_tag:
-                    full_url = urljoin(current_url, a_tag['href'])
-                    # Only follow links that extend the current path to stay in scope
-                    if full_url.startswith(current_url.replace('.html', '')):
-                        next_batch.append(full_url)
-            for link in next_batch:
-                dfs(link, page)
-
-        else:
-            download_brochure(current_url)
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        dfs(root_url, page)
-        browser.close()
-
-
-def download_brochure(page_url, download_folder="brochures/aia"):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    }
 
+def extract_product_links(html, current_url):
+    """
+    Returns the in-scope product links of a list page, or an empty list if
+    the page is a leaf (product detail) page.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    product_divs = soup.find_all('div', class_=PRODUCT_LIST_CLASS)
+
+    links = []
+    for div in product_divs:
+        a_tag = div.find_parent('a', href=True)
+        if a_tag:
+            full_url = urljoin(current_url, a_tag['href'])
+            # Only follow links that extend the current path to stay in scope
+            if full_url.startswith(current_url.replace('.html', '')):
+                links.append(full_url)
+    return links
+
+async def scrape_dynamic_products(root_urls, concurrency=4, pool=None, session=None, manifest=None, download=True, state=None):
+    """
+    Breadth-first crawl of the AIA product tree.
+    A FIFO frontier is shared by `concurrency` workers drawing pages from a BrowserPool.
+    List pages push their product links onto the frontier; leaf pages hand the
+    HTML captured during navigation straight to `download_brochure`.
+
+    Pages recorded in the crawl state are first re-validated over plain HTTP;
+    if unchanged (and their brochures are on disk) the browser load is skipped
+    and the recorded links are reused.
+
+    A shared `pool` / requests `session` / crawl `state` can be passed in (see insurers.orchestrator);
+    discovered brochures are appended to `manifest` if given, and with
+    `download=False` nothing is downloaded.
+    """
+    if isinstance(root_urls, str):
+        root_urls = [root_urls]
+
+    frontier: asyncio.Queue[str] = asyncio.Queue()
+    visited = set()
+    downloads = []
+
+    for url in root_urls:
+        if url not in visited:
+            visited.add(url)
+            frontier.put_nowait(url)
+
+    async def worker(pool: BrowserPool):
+        while True:
+            current_url = await frontier.get()
+            try:
+                try:
+                    record = state.page(current_url)
+                    if (
+                        record is not None
+                        and state.brochures_fresh(current_url)
+                        and await asyncio.to_thread(fetcher.is_unchanged, current_url)
+                    ):
+                        print(f"[~] Unchanged: {current_url}")
+                        next_batch = record.links
+                        if not next_batch:
+                            if manifest is not None:
+                                manifest.extend(manifest_entry("aia", url, current_url) for url, _ in state.brochures_for(current_url))
+                            continue
+                        html, changed = None, False
+                    else:
+                        html = await pool.fetch_html(current_url, SITE_WAITS["aia"])
+                        changed = state.record_page(current_url, "aia", html)
+                        next_batch = extract_product_links(html, current_url)
+                        state.record_links(current_url, next_batch)
+                        if next_batch:
+                            # listing page: processed, no brochures of its own
+                            state.expect_brochures(current_url, "aia", [])
+                except Exception as e:
+                    print(f"[!] Failed to load {current_url}: {e}")
+                    continue
+
+                if next_batch:
+                    print(f"Current page: {current_url}, found {len(next_batch)} products")
+                    for link in next_batch:
+                        if link not in visited:
+                            visited.add(link)
+                            frontier.put_nowait(link)
+                elif changed or not state.brochures_fresh(current_url):
+                    # brochure download runs off the event loop while the crawl continues
+                    downloads.append(asyncio.create_task(
+                        asyncio.to_thread(
+                            download_brochure, current_url, html=html, state=state, manifest=manifest, download=download,
+                        )
+                    ))
+            finally:
+                frontier.task_done()
+
+    with crawl_state(state) as state, Fetcher(session=session, state=state) as fetcher:
+        async with AsyncExitStack() as stack:
+            if pool is None:
+                pool = await stack.enter_async_context(BrowserPool(size=concurrency))
+            workers = [asyncio.create_task(worker(pool)) for _ in range(concurrency)]
+            try:
+                await frontier.join()
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        return [path for path in await asyncio.gather(*downloads) if path]
+
+
+def download_brochure(page_url, html=None, download_folder="brochures/aia", state=None, manifest=None, download=True):
+    """
+    Downloads the brochure linked from a product page.
+    If `html` is given (e.g. captured by the crawler) the page is not fetched again.
+    The download is recorded in the crawl `state` and the brochure appended to
+    `manifest` if given; with `download=False` it is only discovered.
+    """
     try:
-        response = requests.get(page_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        if html is None:
+            response = requests.get(page_url, headers=HEADERS, timeout=15)
+            response.raise_for_status()
+            html = response.text
+        soup = BeautifulSoup(html, 'html.parser')
 
         download_tag = soup.find('a', {'data-cmp-is': 'document-download-link'})
 
         if not download_tag or not download_tag.get('href'):
             print(f"[-] No brochure link found on: {page_url}")
+            if state is not None:
+                state.expect_brochures(page_url, "aia", [])
             return None
 
         file_url = urljoin(page_url, download_tag['href'])
+        if state is not None:
+            state.expect_brochures(page_url, "aia", [file_url])
         
         parsed_url = urlparse(file_url)
         filename = os.path.basename(parsed_url.path)
@@ -101,11 +181,18 @@ def download_brochure(page_url, download_folder="brochures/aia"):
             print(f"[-] Could not determine filename from URL: {file_url}")
             return None
 
+        print(f"[*] Found: {filename}")
+        if manifest is not None:
+            manifest.append(manifest_entry("aia", file_url, page_url, filename))
+        if not download:
+            return None
+
         os.makedirs(download_folder, exist_ok=True)
         file_path = os.path.join(download_folder, filename)
         
-        print(f"[*] Found: {filename}")
         download_file_from_url(file_url, file_path)
+        if state is not None and os.path.exists(file_path):
+            state.record_brochure(file_url, page_url, "aia", file_path)
         return file_path
 
     except Exception as e:
@@ -119,6 +206,4 @@ if __name__ == "__main__":
     # for l in major_links:
     #     print(l)
     
-    for l in major_links:
-        if l.split("/")[-1] == 'health':
-            scrape_dynamic_products(l)
+    asyncio.run(scrape_dynamic_products(major_links))
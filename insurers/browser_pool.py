@@ -0,0 +1,213 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from playwright.async_api import Page, async_playwright
+from playwright.async_api import TimeoutError as AsyncTimeoutError
+from playwright.sync_api import sync_playwright
+from playwright.sync_api import TimeoutError as SyncTimeoutError
+
+from common.session import USER_AGENT
+
+# Stylesheets are kept: several scrapers rely on visibility checks.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+BLOCKED_URL_PATTERN = re.compile(
+    r"google-analytics\.com|googletagmanager\.com|doubleclick\.net|facebook\.(?:net|com)/tr"
+    r"|connect\.facebook\.net|hotjar\.com|adobedtm\.com|demdex\.net|omtrdc\.net|newrelic\.com"
+    r"|nr-data\.net|clarity\.ms|linkedin\.com/px|youtube\.com/embed|player\.vimeo\.com",
+    re.IGNORECASE,
+)
+
+LAUNCH_ARGS = ["--disable-dev-shm-usage", "--disable-extensions", "--mute-audio"]
+
+
+@dataclass(frozen=True)
+class WaitStrategy:
+    """
+    How to decide a page is ready.
+    `wait_until` is passed to `page.goto`; if `selector` is set we additionally wait
+    (at most `selector_timeout` ms) for it to be attached. A missing selector is not
+    an error, the page content is used as-is.
+    """
+    wait_until: str = "domcontentloaded"
+    selector: Optional[str] = None
+    timeout: int = 30000
+    selector_timeout: int = 10000
+
+
+SITE_WAITS = {
+    "aia": WaitStrategy(
+        selector="div.cmp-hkproductfilterlist__productcard, a[data-cmp-is='document-download-link']",
+    ),
+    "fwd_list": WaitStrategy(selector="#product-list div[id^='product-card-']", timeout=60000),
+    "fwd_product": WaitStrategy(selector="a[href*='.pdf' i]"),
+    "prudential": WaitStrategy(selector="main a[href*='/products/'], a[href$='.pdf' i]"),
+    "manulife": WaitStrategy(selector="a[href*='.pdf' i]"),
+    "census_hk": WaitStrategy(selector="a[href$='.xls' i], a[href$='.xlsx' i]"),
+    "fwd_reports": WaitStrategy(selector="div[role='button']", timeout=15000),
+    "manulife_newsroom": WaitStrategy(selector="a.dl-link"),
+}
+
+
+def should_block(resource_type: str, url: str, blocked_types=BLOCKED_RESOURCE_TYPES) -> bool:
+    return resource_type in blocked_types or BLOCKED_URL_PATTERN.search(url) is not None
+
+
+async def block_resources(context, blocked_types=BLOCKED_RESOURCE_TYPES):
+    """Aborts requests for heavy or tracking resources on every page of an async context."""
+    async def handler(route):
+        request = route.request
+        if should_block(request.resource_type, request.url, blocked_types):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handler)
+
+
+def block_resources_sync(context, blocked_types=BLOCKED_RESOURCE_TYPES):
+    """Sync API counterpart of `block_resources`."""
+    def handler(route):
+        request = route.request
+        if should_block(request.resource_type, request.url, blocked_types):
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handler)
+
+
+async def goto(page: Page, url: str, strategy: WaitStrategy = WaitStrategy()):
+    response = await page.goto(url, wait_until=strategy.wait_until, timeout=strategy.timeout)
+    if strategy.selector:
+        try:
+            await page.wait_for_selector(strategy.selector, state="attached", timeout=strategy.selector_timeout)
+        except AsyncTimeoutError:
+            pass
+    return response
+
+
+def goto_sync(page, url: str, strategy: WaitStrategy = WaitStrategy()):
+    response = page.goto(url, wait_until=strategy.wait_until, timeout=strategy.timeout)
+    if strategy.selector:
+        try:
+            page.wait_for_selector(strategy.selector, state="attached", timeout=strategy.selector_timeout)
+        except SyncTimeoutError:
+            pass
+    return response
+
+
+# Cheap fingerprint of the nodes matching a selector: their count plus total markup size.
+DOM_SIGNATURE_JS = """(selector) => {
+    const nodes = document.querySelectorAll(selector);
+    let size = 0;
+    for (const node of nodes) size += node.outerHTML.length;
+    return nodes.length + ':' + size;
+}"""
+DOM_CHANGED_JS = f"([selector, previous]) => ({DOM_SIGNATURE_JS})(selector) !== previous"
+
+
+async def dom_signature(page: Page, selector: str) -> str:
+    return await page.evaluate(DOM_SIGNATURE_JS, selector)
+
+
+async def wait_for_dom_change(page: Page, selector: str, previous: str, timeout: int = 10000) -> bool:
+    """
+    Waits until the nodes matching `selector` differ from the `previous` signature,
+    e.g. after clicking "Show more" until new product cards are rendered.
+    Returns False if nothing changed within `timeout` ms.
+    """
+    try:
+        await page.wait_for_function(DOM_CHANGED_JS, arg=[selector, previous], timeout=timeout)
+        return True
+    except AsyncTimeoutError:
+        return False
+
+
+def dom_signature_sync(page, selector: str) -> str:
+    return page.evaluate(DOM_SIGNATURE_JS, selector)
+
+
+def wait_for_dom_change_sync(page, selector: str, previous: str, timeout: int = 10000) -> bool:
+    """Sync API counterpart of `wait_for_dom_change`."""
+    try:
+        page.wait_for_function(DOM_CHANGED_JS, arg=[selector, previous], timeout=timeout)
+        return True
+    except SyncTimeoutError:
+        return False
+
+
+class BrowserPool:
+    """
+    One Chromium instance with a fixed pool of pages.
+    Each page lives in its own long-lived context with resource blocking installed,
+    so contexts are reused across navigations instead of being created per URL.
+
+        async with BrowserPool(size=4) as pool:
+            html = await pool.fetch_html(url, SITE_WAITS["aia"])
+    """
+
+    def __init__(self, size=4, headless=True, block=True, blocked_types=BLOCKED_RESOURCE_TYPES, user_agent=USER_AGENT):
+        self.size = size
+        self.headless = headless
+        self.block = block
+        self.blocked_types = blocked_types
+        self.user_agent = user_agent
+        self._playwright = None
+        self.browser = None
+        self._contexts = []
+        self._pages: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self):
+        self._playwright = await async_playwright().start()
+        self.browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        for _ in range(self.size):
+            context = await self.browser.new_context(user_agent=self.user_agent)
+            if self.block:
+                await block_resources(context, self.blocked_types)
+            self._contexts.append(context)
+            self._pages.put_nowait(await context.new_page())
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            for context in self._contexts:
+                await context.close()
+            if self.browser is not None:
+                await self.browser.close()
+        finally:
+            if self._playwright is not None:
+                await self._playwright.stop()
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrows a page from the pool; waits if all pages are in use."""
+        page = await self._pages.get()
+        try:
+            yield page
+        finally:
+            self._pages.put_nowait(page)
+
+    async def fetch_html(self, url: str, strategy: WaitStrategy = WaitStrategy()) -> str:
+        async with self.page() as page:
+            await goto(page, url, strategy)
+            return await page.content()
+
+
+@contextmanager
+def sync_page(headless=True, block=True, blocked_types=BLOCKED_RESOURCE_TYPES, user_agent=USER_AGENT):
+    """
+    Sync API helper for the single-page scrapers: yields one page whose context has
+    resource blocking installed. The context is reachable as `page.context`.
+    """
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+        try:
+            context = browser.new_context(user_agent=user_agent)
+            if block:
+                block_resources_sync(context, blocked_types)
+            yield context.new_page()
+        finally:
+            browser.close()
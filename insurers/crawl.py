@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlsplit, urlunsplit
+
+CACHE_DIR = os.getenv("AIA_CACHE_DIR", ".cache")
+CRAWL_DB = os.path.join(CACHE_DIR, "crawl.sqlite3")
+
+TRACKING_PARAM_RE = re.compile(
+    r"^(?:utm_[a-z]+|gclid|gclsrc|dclid|fbclid|msclkid|yclid|mc_cid|mc_eid|_ga|_gl|icid|cmpid|s_kwcid)$",
+    re.IGNORECASE,
+)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalises a URL so that variants of the same page compare equal:
+    lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the remaining query and strips trailing slashes.
+    The result is a dedupe / state key; fetch the URL as it was linked.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = f"[{host}]" if ":" in host else host  # IPv6 literal
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAM_RE.match(k)
+    )
+    return urlunsplit((scheme, netloc, path, urlencode(query, quote_via=quote), ""))
+
+
+def in_scope(url: str, scope: str) -> bool:
+    """True if canonical `url` is `scope` itself or below it (both canonical)."""
+    return url == scope or url.startswith(scope + "/")
+
+
+def connect(path: str, **kwargs) -> sqlite3.Connection:
+    """
+    Opens the crawl database in WAL mode, so that the frontier and the crawl state
+    (separate connections, often in one process) can read while the other writes.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, **kwargs)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+
+def compile_keywords(keywords: Iterable[str]) -> re.Pattern:
+    """One case-insensitive alternation for a keyword set; longest keywords first."""
+    ordered = sorted(keywords, key=len, reverse=True)
+    return re.compile("|".join(re.escape(k) for k in ordered), re.IGNORECASE)
+
+
+class CrawlFrontier:
+    """
+    Breadth-first frontier with a persistent visited set, keyed on canonical URLs
+    and stored in SQLite so that a crawl can be resumed after an interruption.
+    Every URL enters the frontier at most once per crawl `name`; the URL it was
+    first linked as is kept alongside, for fetching.
+    """
+
+    QUEUED, ACTIVE, DONE = 0, 1, 2
+
+    def __init__(self, name: str, path: str = CRAWL_DB, resume: bool = False):
+        self.name = name
+        self._db = connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " crawl TEXT, url TEXT, depth INTEGER, state INTEGER DEFAULT 0,"
+            " seq INTEGER, PRIMARY KEY (crawl, url))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS frontier_next ON frontier (crawl, state, depth, seq)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(frontier)")}
+        if "fetch_url" not in columns:  # frontiers from before the linked URL was kept
+            self._db.execute("ALTER TABLE frontier ADD COLUMN fetch_url TEXT")
+        if resume:
+            # pages that were in flight when the last run stopped are retried
+            self._db.execute("UPDATE frontier SET state = ? WHERE crawl = ? AND state = ?", (self.QUEUED, name, self.ACTIVE))
+        else:
+            self._db.execute("DELETE FROM frontier WHERE crawl = ?", (name,))
+        self._db.commit()
+        self._seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM frontier WHERE crawl = ?", (name,)).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __contains__(self, url: str) -> bool:
+        row = self._db.execute("SELECT 1 FROM frontier WHERE crawl = ? AND url = ?", (self.name, url)).fetchone()
+        return row is not None
+
+    def push(self, url: str, depth: int, fetch_url: Optional[str] = None) -> bool:
+        """Queues a canonical URL, fetched as `fetch_url` (default: `url`); returns False if it was already seen."""
+        self._seq += 1
+        cur = self._db.execute(
+            "INSERT OR IGNORE INTO frontier (crawl, url, depth, state, seq, fetch_url) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.name, url, depth, self.QUEUED, self._seq, fetch_url),
+        )
+        # committed right away: an open write transaction would lock out the crawl state
+        self._db.commit()
+        return cur.rowcount > 0
+
+    def pop(self) -> Optional[Tuple[str, int, str]]:
+        """
+        Claims the shallowest, oldest queued URL and returns (canonical URL, depth,
+        URL to fetch), or None when the frontier is empty.
+        """
+        row = self._db.execute(
+            "SELECT url, depth, fetch_url FROM frontier WHERE crawl = ? AND state = ? ORDER BY depth, seq LIMIT 1",
+            (self.name, self.QUEUED),
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE frontier SET state = ? WHERE crawl = ? AND url = ?", (self.ACTIVE, self.name, row[0]))
+        self._db.commit()
+        return row[0], row[1], row[2] or row[0]
+
+    def done(self, url: str):
+        self._db.execute("UPDATE frontier SET state = ? WHERE crawl = ? AND url = ?", (self.DONE, self.name, url))
+        self._db.commit()
+
+
+# Scripts, comments and whitespace churn (nonces, build ids) should not count as a content change.
+VOLATILE_HTML_RE = re.compile(r"<script\b.*?</script>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+
+
+def content_hash(html: str) -> str:
+    stable = VOLATILE_HTML_RE.sub("", html)
+    stable = " ".join(stable.split())
+    return hashlib.sha256(stable.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PageRecord:
+    url: str
+    site: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: Optional[str]
+    probe_hash: Optional[str]
+    fetched_at: float
+    links: List[str]
+    brochures_hash: Optional[str] = None  # content hash the brochures were last selected from
+
+
+class CrawlState:
+    """
+    What previous crawls saw, shared by all insurer scrapers (SQLite, same file as the frontier).
+    `pages` keeps validators and a content hash per page URL plus the links found on it;
+    `brochures` keeps each brochure selected on a page with the hash of the page it came
+    from, and its local path once downloaded.
+    A page whose conditional GET returns 304, or whose hash is unchanged, whose brochures
+    were selected from that content and are all on disk does not need to be processed again.
+    """
+
+    def __init__(self, path: str = CRAWL_DB):
+        # the async scrapers record brochures from worker threads
+        self._db = connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, site TEXT, etag TEXT, last_modified TEXT,"
+            " content_hash TEXT, probe_hash TEXT, fetched_at REAL, links TEXT, brochures_hash TEXT);"
+            "CREATE TABLE IF NOT EXISTS brochures ("
+            " url TEXT PRIMARY KEY, page_url TEXT, site TEXT, path TEXT,"
+            " source_hash TEXT, downloaded_at REAL);"
+            "CREATE INDEX IF NOT EXISTS brochures_page ON brochures (page_url);"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "brochures_hash" not in columns:  # databases from before brochures were tracked per page
+            self._db.execute("ALTER TABLE pages ADD COLUMN brochures_hash TEXT")
+            self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            cur = self._db.execute(sql, params)
+            rows = cur.fetchall()
+            self._db.commit()
+            return rows
+
+    def page(self, url: str) -> Optional[PageRecord]:
+        rows = self._execute(
+            "SELECT url, site, etag, last_modified, content_hash, probe_hash, fetched_at, links, brochures_hash"
+            " FROM pages WHERE url = ?", (url,),
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return PageRecord(*row[:7], links=json.loads(row[7] or "[]"), brochures_hash=row[8])
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        record = self.page(url)
+        headers = {}
+        if record is not None:
+            if record.etag:
+                headers["If-None-Match"] = record.etag
+            if record.last_modified:
+                headers["If-Modified-Since"] = record.last_modified
+        return headers
+
+    def record_page(self, url: str, site: str, html: str, etag=None, last_modified=None) -> bool:
+        """Stores the page's hash and validators; returns True if the content changed (or is new)."""
+        new_hash = content_hash(html)
+        # read and write under one lock, so only one of two workers recording the same page sees it change
+        with self._lock, self._db:
+            row = self._db.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT INTO pages (url, site, etag, last_modified, content_hash, fetched_at) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET site = excluded.site,"
+                " etag = COALESCE(excluded.etag, pages.etag),"
+                " last_modified = COALESCE(excluded.last_modified, pages.last_modified),"
+                " content_hash = excluded.content_hash,"
+                " fetched_at = excluded.fetched_at",
+                (url, site, etag, last_modified, new_hash, time.time()),
+            )
+        return row is None or row[0] != new_hash
+
+    def touch(self, url: str):
+        """Marks a page as re-validated (e.g. after a 304)."""
+        self._execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def record_probe(self, url: str, etag=None, last_modified=None, probe_hash=None):
+        """Stores validators and hash of a plain HTTP probe of a browser-rendered page."""
+        self._execute(
+            "UPDATE pages SET etag = ?, last_modified = ?, probe_hash = ?, fetched_at = ? WHERE url = ?",
+            (etag, last_modified, probe_hash, time.time(), url),
+        )
+
+    def record_links(self, url: str, links: Iterable[str]):
+        self._execute("UPDATE pages SET links = ? WHERE url = ?", (json.dumps(sorted(links)), url))
+
+    def expect_brochures(self, page_url: str, site: str, urls: Iterable[str]):
+        """
+        Records the brochures selected on a page from its current content, before they
+        are downloaded: each gets a row without a path until `record_brochure` fills
+        it in, and rows of brochures the page no longer links to are dropped.
+        Call it with no URLs for a processed page that has no brochures.
+        """
+        with self._lock, self._db:
+            row = self._db.execute("SELECT content_hash FROM pages WHERE url = ?", (page_url,)).fetchone()
+            source_hash = row[0] if row else None
+            self._db.execute("DELETE FROM brochures WHERE page_url = ?", (page_url,))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO brochures (url, page_url, site, path, source_hash, downloaded_at)"
+                " VALUES (?, ?, ?, NULL, ?, NULL)",
+                [(url, page_url, site, source_hash) for url in urls],
+            )
+            self._db.execute("UPDATE pages SET brochures_hash = ? WHERE url = ?", (source_hash, page_url))
+
+    def record_brochure(self, url: str, page_url: str, site: str, path: Optional[str]):
+        """`path` is None when the brochure was only discovered, not downloaded."""
+        record = self.page(page_url)
+        source_hash = record.content_hash if record else None
+        self._execute(
+            "INSERT OR REPLACE INTO brochures (url, page_url, site, path, source_hash, downloaded_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (url, page_url, site, path, source_hash, time.time()),
+        )
+
+    def brochures_for(self, page_url: str) -> List[Tuple[str, Optional[str]]]:
+        """(brochure url, local path) pairs recorded for a page."""
+        return [tuple(row) for row in self._execute("SELECT url, path FROM brochures WHERE page_url = ?", (page_url,))]
+
+    def brochures_fresh(self, page_url: str) -> bool:
+        """
+        True if the page's brochures were selected from its current content (see
+        `expect_brochures`) and every one of them is on disk.
+        """
+        record = self.page(page_url)
+        if record is None or record.brochures_hash is None or record.brochures_hash != record.content_hash:
+            return False
+        rows = self._execute("SELECT path, source_hash FROM brochures WHERE page_url = ?", (page_url,))
+        return all(
+            source_hash == record.content_hash and path and os.path.exists(path)
+            for path, source_hash in rows
+        )
+
+
+def crawl_state(state: Optional[CrawlState] = None):
+    """Context manager for a crawl: a shared `state` stays open for its owner, otherwise a new one is opened and closed."""
+    return nullcontext(state) if state is not None else CrawlState()
+
+
+def manifest_entry(insurer: str, url: str, page_url: str, filename: Optional[str] = None) -> Dict[str, str]:
+    """A brochure record in the shape `upload_helper upload-json` reads (source_url, filename)."""
+    return {
+        "insurer": insurer,
+        "source_url": url,
+        "filename": filename or os.path.basename(urlparse(url).path),
+        "page_url": page_url,
+    }
@@ -1,17 +1,10 @@
 from curl_cffi import requests
 
-def download_file_from_url(file_url, file_path, headers=None, timeout=15):
-    default_headers = {
-        "User-Agent": "Chrome/120.0.0.0",
-        "Content-Type": "application/pdf",
-        "Accept": "application/pdf",
-        "Accept-Encoding": "gzip, deflate, br",
-    }
+from common.session import DOWNLOAD_HEADERS, IMPERSONATE
 
-    if headers:
-        default_headers.update(headers)
-
-    headers = default_headers
+def download_file_from_url(file_url, file_path, headers=None, timeout=15) -> bool:
+    """Downloads a PDF to `file_path`. Returns True if the file was written."""
+    headers = {**DOWNLOAD_HEADERS, **(headers or {})}
 
     try:
         r = requests.get(
@@ -19,20 +12,21 @@ def download_file_from_url(file_url, file_path, headers=None, timeout=15):
             headers=headers,
             stream=True,
             timeout=timeout,
-            impersonate="chrome110",
+            impersonate=IMPERSONATE,
         )
         r.raise_for_status()
 
         content_type = r.headers.get("content-type", "").lower()
         if "application/pdf" not in content_type:
             print(r.text)
-            return
+            return False
 
         if r.status_code != 200:
-            return
+            return False
 
         with open(file_path, "wb") as f:
             f.write(r.content)
+        return True
 
     except Exception:
-        ...
+        return False
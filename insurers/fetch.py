@@ -0,0 +1,198 @@
+import json
+import os
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import lxml.etree
+import lxml.html
+import requests
+
+from common.session import build_session
+from insurers.browser_pool import SITE_WAITS, WaitStrategy, goto_sync, sync_page
+from insurers.crawl import CACHE_DIR, CrawlState, content_hash
+
+FETCH_LOG_DIR = os.path.join(CACHE_DIR, "fetch-log")
+
+
+@dataclass(frozen=True)
+class SiteProfile:
+    """
+    `expected_xpath` must match on the HTTP response for it to be used as-is;
+    otherwise the page is rendered in the browser with `wait`.
+    Set `http_first=False` for sites known to need JavaScript.
+    """
+    name: str
+    expected_xpath: str
+    wait: WaitStrategy = WaitStrategy()
+    http_first: bool = True
+
+
+PDF_LINK_XPATH = "//a[contains(translate(@href, 'PDF', 'pdf'), '.pdf')]"
+# links from the rendered product cards to a product page (/products/<category>/<plan>/),
+# which the server-side shell (header, breadcrumbs, category menu) does not have
+PRUDENTIAL_PRODUCT_XPATH = (
+    "//main//a[contains(@href, '/products/')]"
+    "[string-length(substring-after(substring-after(@href, '/products/'), '/')) > 1]"
+    "[not(ancestor::nav or ancestor::header or ancestor::footer)]"
+)
+
+SITE_PROFILES = {
+    "prudential": SiteProfile(
+        "prudential",
+        f"{PDF_LINK_XPATH} | {PRUDENTIAL_PRODUCT_XPATH}",
+        SITE_WAITS["prudential"],
+    ),
+    "manulife": SiteProfile("manulife", PDF_LINK_XPATH, SITE_WAITS["manulife"]),
+    "manulife_newsroom": SiteProfile(
+        "manulife_newsroom",
+        "//a[contains(concat(' ', normalize-space(@class), ' '), ' dl-link ')]",
+        SITE_WAITS["manulife_newsroom"],
+    ),
+}
+
+
+@dataclass
+class FetchResult:
+    """`changed` is False when a crawl state says the page is the same as last time;
+    on a 304 `html` is empty and `tree` is None."""
+    url: str
+    html: str
+    source: str  # "http" or "browser"
+    tree: Optional[lxml.html.HtmlElement]
+    changed: bool = True
+
+
+def parse_html(response: requests.Response) -> Optional[lxml.html.HtmlElement]:
+    """
+    lxml tree of a response body, or None if it is empty or cannot be parsed. Bytes
+    are parsed (lxml rejects str with an XML encoding declaration), in the response's
+    encoding if it is known.
+    """
+    if not response.content:
+        return None
+    try:
+        parser = lxml.html.HTMLParser(encoding=response.encoding) if response.encoding else None
+        return lxml.html.fromstring(response.content, parser=parser)
+    except (lxml.etree.LxmlError, ValueError, LookupError):
+        return None
+
+
+class Fetcher:
+    """
+    HTTP-first page fetcher with browser fallback.
+    Pages are fetched with a pooled GET and parsed with lxml; only when the site's
+    expected selector is missing (or the GET fails) is the page rendered in Chromium.
+    Which path served each URL is kept in `served_by` and, if `log_path` is set,
+    appended to a JSON-lines log so site profiles can be tuned.
+
+    `browser_fetch(url, wait) -> html` replaces the default lazily launched sync browser,
+    e.g. to share one browser between several crawlers.
+
+    With a `state`, HTTP fetches are conditional (ETag / Last-Modified) and every
+    result carries `changed` so re-crawls can skip unchanged pages.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        browser_fetch: Optional[Callable[[str, WaitStrategy], str]] = None,
+        timeout=15,
+        log_path: Optional[str] = None,
+        state: Optional[CrawlState] = None,
+    ):
+        self.session = session or build_session()
+        self.timeout = timeout
+        self.log_path = log_path
+        self.state = state
+        self.served_by = {}
+        self._browser_fetch = browser_fetch
+        self._stack = ExitStack()
+        self._page = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._stack.close()
+        self._page = None
+
+    def fetch(self, url: str, profile: SiteProfile, conditional=True, key: Optional[str] = None) -> FetchResult:
+        """Fetches `url`; the crawl state records it under `key` (e.g. its canonical URL), default `url`."""
+        key = key or url
+        if profile.http_first:
+            headers = self.state.conditional_headers(key) if self.state and conditional else {}
+            response = self._http_get(url, headers)
+            if response is not None and response.status_code == 304:
+                self.state.touch(key)
+                return self._record(url, profile, FetchResult(url, "", "http", None, changed=False))
+            # an empty or unparseable body falls through to the browser
+            tree = parse_html(response) if response is not None else None
+            if tree is not None and tree.xpath(profile.expected_xpath):
+                changed = True
+                if self.state:
+                    changed = self.state.record_page(
+                        key, profile.name, response.text,
+                        response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                    )
+                return self._record(url, profile, FetchResult(url, response.text, "http", tree, changed))
+
+        html = self._render(url, profile.wait)
+        changed = self.state.record_page(key, profile.name, html) if self.state else True
+        return self._record(url, profile, FetchResult(url, html, "browser", lxml.html.fromstring(html), changed))
+
+    def is_unchanged(self, url: str) -> bool:
+        """
+        Cheap HTTP re-validation of a page known to the crawl state, used before
+        rendering browser-only pages: a 304, or the same body hash as the last
+        probe, means the page has not changed.
+        """
+        record = self.state.page(url) if self.state else None
+        if record is None:
+            return False
+        response = self._http_get(url, self.state.conditional_headers(url))
+        if response is None:
+            return False
+        if response.status_code == 304:
+            self.state.touch(url)
+            return True
+        probe_hash = content_hash(response.text)
+        self.state.record_probe(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), probe_hash)
+        return record.probe_hash == probe_hash
+
+    def stats(self) -> Counter:
+        return Counter(self.served_by.values())
+
+    def _http_get(self, url: str, headers=None) -> Optional[requests.Response]:
+        """GET returning a 200 HTML response or a 304, else None."""
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and headers:
+                return response
+            if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+                return None
+            if "charset" not in response.headers.get("content-type", "").lower():
+                response.encoding = response.apparent_encoding
+            return response
+        except requests.RequestException:
+            return None
+
+    def _render(self, url: str, wait: WaitStrategy) -> str:
+        if self._browser_fetch is not None:
+            return self._browser_fetch(url, wait)
+        if self._page is None:
+            self._page = self._stack.enter_context(sync_page())
+        goto_sync(self._page, url, wait)
+        return self._page.content()
+
+    def _record(self, url: str, profile: SiteProfile, result: FetchResult) -> FetchResult:
+        self.served_by[url] = result.source
+        if self.log_path:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"site": profile.name, "url": url, "source": result.source}) + "\n")
+        return result
@@ -1,12 +1,18 @@
+import argparse
 import asyncio
 import os
+from contextlib import AsyncExitStack
 from urllib.parse import urljoin, urlparse
 
-from playwright.async_api import Browser, Locator, Page, async_playwright
+from playwright.async_api import Locator, Page
 
+from insurers.browser_pool import SITE_WAITS, BrowserPool, dom_signature, goto, wait_for_dom_change
+from insurers.crawl import crawl_state, manifest_entry
 from insurers.download_file import download_file_from_url
+from insurers.fetch import Fetcher
 
 BASE_URL = "https://www.fwd.com.hk"
+PRODUCT_CARD_SELECTOR = "#product-list div[id^='product-card-']"
 
 async def locate_show_more_button(page: Page) -> Locator:
     """
@@ -17,6 +23,7 @@ async def locate_show_more_button(page: Page) -> Locator:
 async def expand_list(page: Page):
     """
     Repeatedly clicks the 'Show more' button until it's no longer visible or a limit is reached.
+    After each click we wait for the product cards to change rather than sleeping.
     """
     locator = await locate_show_more_button(page)
     count = await locator.count()
@@ -33,10 +40,13 @@ async def expand_list(page: Page):
         if await button.is_visible():
             try:
                 print(f"Clicking 'Show more' (Attempt {click_count + 1})...")
+                before = await dom_signature(page, PRODUCT_CARD_SELECTOR)
                 await button.scroll_into_view_if_needed()
                 await button.click(force=True, timeout=5000) 
-                await page.wait_for_timeout(1500) # Wait for content to load
                 click_count += 1
+                if not await wait_for_dom_change(page, PRODUCT_CARD_SELECTOR, before):
+                    print("No new products after click, stop expanding.")
+                    break
             except Exception as e:
                 print(f"Failed to click button: {e}")
                 break
@@ -53,115 +63,192 @@ async def get_product_containers(page: Page):
     await page.wait_for_selector("#product-list")
     
     # Locate all containers with id starting with 'product-card-' inside #product-list
-    containers = page.locator("#product-list div[id^='product-card-']") 
+    containers = page.locator(PRODUCT_CARD_SELECTOR) 
     count = await containers.count()
 
     for i in range(count):
         yield containers.nth(i) # generator
 
-async def handle_product_card(browser: Browser, card: Locator, keyword=None):
+async def read_card_links(card: Locator, keyword=None):
     """
-    Extracts the product link from the card and processes the detail page.
+    Returns the hrefs of a product card, or None if the card does not match `keyword`.
     """
     if keyword is not None:
         productTags = card.locator('div[class^="ProductCard__TagLink"]')
         tags = await productTags.all_inner_texts()
         if tags is None or not any(keyword in tag for tag in tags):
-            return
+            return None
 
     links = card.locator("a")
     count = await links.count()
-    
+    hrefs = []
     for i in range(count):
         href = await links.nth(i).get_attribute("href")
-        if not href:
-            continue
+        if href:
+            hrefs.append(href)
+    return hrefs
+
+async def handle_product_card(pool: BrowserPool, card: Locator, keyword=None, fetcher: Fetcher = None, manifest=None, download=True) -> str:
+    """
+    Extracts the product link from the card and processes the detail page.
+    Returns "downloaded", "unchanged", "skipped" or "failed".
+    """
+    hrefs = await read_card_links(card, keyword)
+    if not hrefs:
+        return "skipped"
 
+    statuses = []
+    for href in hrefs:
         if '.pdf' in href:
             href = urljoin(BASE_URL, href)
             filename = href.split('/')[-1]
-            os.makedirs('brochures', exist_ok=True)
-            download_file_from_url(href, f"brochures/fwd/{filename}")
+            if manifest is not None:
+                manifest.append(manifest_entry("fwd", href, BASE_URL + "/en/products/", filename))
+            if not download:
+                statuses.append("skipped")
+                continue
+            os.makedirs('brochures/fwd', exist_ok=True)
+            ok = await asyncio.to_thread(download_file_from_url, href, f"brochures/fwd/{filename}")
+            statuses.append("downloaded" if ok else "failed")
         else:
             # urljoin to join BASEURL with partial incomplete path (href)
             page_url = urljoin(BASE_URL, href)
-            await process_product_page(browser, page_url)
+            statuses.append(await process_product_page(pool, page_url, fetcher, manifest, download))
+
+    for status in ("downloaded", "failed", "unchanged"):
+        if status in statuses:
+            return status
+    return "skipped"
 
-async def process_product_page(browser: Browser, product_url: str):
+async def process_product_page(pool: BrowserPool, product_url: str, fetcher: Fetcher = None, manifest=None, download=True) -> str:
     """
     Navigates to the product page and downloads the brochure if found.
-    """
-    context = await browser.new_context()
-    page = await context.new_page()
-
-    # it seems there is running JS script in online insurance paths
-    tmp = product_url.replace(BASE_URL, "")
-    if tmp.startswith('online-insurance'): 
-        wait_mode = "load"
-    else:
-        wait_mode = "networkidle"
+    Returns "downloaded", "skipped" (no brochure link) or "failed".
 
+    With a `fetcher` holding a crawl state, a page that is unchanged since the last
+    crawl and whose brochure is on disk returns "unchanged" without re-downloading;
+    the browser load itself is skipped if a plain HTTP probe already shows no change.
+    The brochure is appended to `manifest` if given; with `download=False` it is
+    only discovered and the card counts as "skipped".
+    """
     parsed = urlparse(product_url)
     product_url_parsed = urljoin(product_url, parsed.path) # remove query string
+    state = fetcher.state if fetcher else None
+
+    def unchanged() -> str:
+        if manifest is not None:
+            manifest.extend(manifest_entry("fwd", url, product_url_parsed) for url, _ in state.brochures_for(product_url_parsed))
+        return "unchanged"
+
+    if (
+        state is not None
+        and state.page(product_url_parsed) is not None
+        and state.brochures_fresh(product_url_parsed)
+        and await asyncio.to_thread(fetcher.is_unchanged, product_url_parsed)
+    ):
+        return unchanged()
     
-    try:
-        await page.goto(product_url_parsed, wait_until=wait_mode, timeout=30*1000)
-        links = page.locator("a")
-        count = await links.count()
+    async with pool.page() as page:
+        try:
+            await goto(page, product_url_parsed, SITE_WAITS["fwd_product"])
+            if state is not None:
+                changed = state.record_page(product_url_parsed, "fwd", await page.content())
+                if not changed and state.brochures_fresh(product_url_parsed):
+                    return unchanged()
+
+            links = page.locator("a")
+            count = await links.count()
         
-        for i in range(count):
-            link = links.nth(i)
-            href = await link.get_attribute("href")
-            text = await link.inner_text()
+            for i in range(count):
+                link = links.nth(i)
+                href = await link.get_attribute("href")
+                text = await link.inner_text()
             
-            if not href or not text or "brochure" not in text.lower():
-                continue
-
-            # Check if it looks like a PDF url (ignoring query params)
-            # e.g. /path/to/file.pdf?v=123#title1 -> /path/to/file.pdf
-            url_path = href.split("?")[0].split("#")[0]
-            if url_path.lower().endswith(".pdf"):
-                filename = url_path.split("/")[-1]
-                
-                output_dir = os.path.join(os.getcwd(), 'brochures/fwd')
-                os.makedirs(output_dir, exist_ok=True)
+                if not href or not text or "brochure" not in text.lower():
+                    continue
+
+                # Check if it looks like a PDF url (ignoring query params)
+                # e.g. /path/to/file.pdf?v=123#title1 -> /path/to/file.pdf
+                url_path = href.split("?")[0].split("#")[0]
+                if url_path.lower().endswith(".pdf"):
+                    filename = url_path.split("/")[-1]
                 
-                download_path = os.path.join(output_dir, filename)
+                    full_url = href
+                    if not href.startswith("https"):
+                        if href.startswith("/"):
+                            full_url = f"{BASE_URL}{href}"
+                        else:
+                            full_url = f"{BASE_URL}/{href}"
+
+                    if state is not None:
+                        state.expect_brochures(product_url_parsed, "fwd", [full_url])
+                    if manifest is not None:
+                        manifest.append(manifest_entry("fwd", full_url, product_url_parsed, filename))
+                    if not download:
+                        return "skipped"
+
+                    output_dir = os.path.join(os.getcwd(), 'brochures/fwd')
+                    os.makedirs(output_dir, exist_ok=True)
                 
-                full_url = href
-                if not href.startswith("https"):
-                    if href.startswith("/"):
-                        full_url = f"{BASE_URL}{href}"
-                    else:
-                        full_url = f"{BASE_URL}/{href}"
-
-                # Run download synchronously in a thread
-                await asyncio.to_thread(download_file_from_url, full_url, download_path)
-                break
+                    download_path = os.path.join(output_dir, filename)
 
-    except Exception as e:
-        print(f"Error processing page: {e}")
-    finally:
-        await page.close()
-        await context.close()
-    
-async def run():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        try:
-            await page.goto(f"{BASE_URL}/en/products/", wait_until="networkidle", timeout=60000)
-            await page.wait_for_timeout(2000)
+                    # Run download synchronously in a thread
+                    ok = await asyncio.to_thread(download_file_from_url, full_url, download_path)
+                    if ok and state is not None:
+                        state.record_brochure(full_url, product_url_parsed, "fwd", download_path)
+                    return "downloaded" if ok else "failed"
 
-            await expand_list(page)
-            
-            async for container in get_product_containers(page):
-                await handle_product_card(browser, container, "medical")
+            if state is not None:
+                state.expect_brochures(product_url_parsed, "fwd", [])
 
         except Exception as e:
-            print(f"Error in main run loop: {e}")
-        finally:
-            await browser.close()
+            print(f"Error processing page: {e}")
+            return "failed"
+
+    return "skipped"
+    
+async def run(keyword="medical", concurrency=4, pool=None, session=None, manifest=None, download=True, state=None):
+    """
+    Expands the product list, then processes the matching cards as concurrent tasks.
+    At most `concurrency` product pages are open at once; they are borrowed from a
+    pool of reusable contexts, plus one page that holds the product list.
+    A shared `pool` / requests `session` / crawl `state` can be passed in (see insurers.orchestrator).
+    Returns a summary of downloaded, unchanged, skipped and failed cards.
+    """
+    summary = {"downloaded": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+    limit = asyncio.Semaphore(concurrency)
+
+    async def bounded(card: Locator) -> str:
+        async with limit:
+            try:
+                return await handle_product_card(pool, card, keyword, fetcher, manifest, download)
+            except Exception as e:
+                print(f"Error processing card: {e}")
+                return "failed"
+
+    with crawl_state(state) as state, Fetcher(session=session, state=state) as fetcher:
+        async with AsyncExitStack() as stack:
+            if pool is None:
+                pool = await stack.enter_async_context(BrowserPool(size=concurrency + 1))
+            async with pool.page() as page:
+                try:
+                    await goto(page, f"{BASE_URL}/en/products/", SITE_WAITS["fwd_list"])
+
+                    await expand_list(page)
+                
+                    cards = [container async for container in get_product_containers(page)]
+                    for status in await asyncio.gather(*(bounded(card) for card in cards)):
+                        summary[status] += 1
+
+                except Exception as e:
+                    print(f"Error in main run loop: {e}")
+
+    return summary
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    parser = argparse.ArgumentParser(description="Download FWD product brochures.")
+    parser.add_argument("--keyword", default="medical", help="Product tag to filter cards by")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max product pages processed at once")
+    args = parser.parse_args()
+
+    print(asyncio.run(run(args.keyword, args.concurrency)))
@@ -0,0 +1,89 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Union
+from urllib.parse import urljoin, urlparse
+
+import lxml.html
+
+# Elements that can carry a document link, matched in one XPath evaluation (document order).
+LINK_CARRIERS_XPATH = "//a[@href] | //*[@data-href] | //*[@onclick]"
+ONCLICK_PDF_RE = re.compile(r"https?://[^\s'\"<>()]+?\.pdf", re.IGNORECASE)
+
+PRIMARY, SECONDARY = 1, 2
+
+
+@dataclass(frozen=True)
+class CandidateLink:
+    url: str  # absolute
+    filename: str
+    kind: str  # "href", "data-href" or "onclick"
+    text: str  # lowercased anchor text ("" for non-anchors)
+    priority: int  # PRIMARY (matches priority keywords) or SECONDARY
+
+
+def _strip_query(href: str) -> str:
+    return href.split("?", 1)[0].split("#", 1)[0]
+
+
+def extract_pdf_links(
+    doc: Union[str, bytes, lxml.html.HtmlElement],
+    page_url: str,
+    priority_re: Optional[re.Pattern] = None,
+    skip_re: Optional[re.Pattern] = None,
+    kinds: Iterable[str] = ("href", "data-href", "onclick"),
+) -> List[CandidateLink]:
+    """
+    Collects PDF links from `<a href>`, `data-href` and `onclick` in a single pass
+    over an lxml tree. Links whose URL matches `skip_re` are dropped; links whose
+    URL or anchor text matches `priority_re` get PRIMARY priority.
+    """
+    tree = lxml.html.fromstring(doc) if isinstance(doc, (str, bytes)) else doc
+    kinds = frozenset(kinds)
+    candidates = []
+
+    def add(raw_url: str, kind: str, element):
+        url = urljoin(page_url, raw_url.strip())
+        url_lower = url.lower()
+        if skip_re is not None and skip_re.search(url_lower):
+            return
+        filename = os.path.basename(urlparse(url).path)
+        if not filename:
+            return
+        text = ""
+        if element.tag == "a":
+            text = " ".join(element.text_content().split()).lower()
+        priority = SECONDARY
+        if priority_re is not None and (priority_re.search(url_lower) or priority_re.search(text)):
+            priority = PRIMARY
+        candidates.append(CandidateLink(url, filename, kind, text, priority))
+
+    for element in tree.xpath(LINK_CARRIERS_XPATH):
+        attrib = element.attrib
+        href = attrib.get("href")
+        if href and "href" in kinds and element.tag == "a" and _strip_query(href).lower().endswith(".pdf"):
+            add(href, "href", element)
+        data_href = attrib.get("data-href")
+        if data_href and "data-href" in kinds and data_href.lower().endswith(".pdf"):
+            add(data_href, "data-href", element)
+        onclick = attrib.get("onclick")
+        if onclick and "onclick" in kinds and ".pdf" in onclick.lower():
+            for url in ONCLICK_PDF_RE.findall(onclick):
+                add(url, "onclick", element)
+
+    return candidates
+
+
+def select_links(candidates: Iterable[CandidateLink], limit: Optional[int] = None, key=lambda c: c.filename) -> List[CandidateLink]:
+    """Orders candidates by priority (stable), drops duplicates by `key` and keeps at most `limit`."""
+    selected = []
+    seen = set()
+    for candidate in sorted(candidates, key=lambda c: c.priority):
+        k = key(candidate)
+        if k in seen:
+            continue
+        seen.add(k)
+        selected.append(candidate)
+        if limit is not None and len(selected) == limit:
+            break
+    return selected
@@ -1,12 +1,17 @@
 import os
 import time
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+
+from insurers.crawl import compile_keywords, crawl_state, manifest_entry
+from insurers.fetch import FETCH_LOG_DIR, SITE_PROFILES, Fetcher
+from insurers.links import extract_pdf_links, select_links
 
 BASE_URL = "https://www.manulife.com.hk"
+PDF_SKIP_RE = compile_keywords(['faq', 'redomiciliation', 'promotion'])
+PDF_PRIORITY_RE = compile_keywords(['product', 'leaflet', 'brochure', 'benefit', 'fact', 'guide'])
 
 def get_product_links(list_page_url):
     """Extract all product links from list page"""
@@ -58,67 +63,45 @@ def download_pdf_with_retry(file_url, filepath, max_retries=3):
                 print(f"  [✗] Failed: {os.path.basename(filepath)}")
                 return False
 
-def download_all_pdfs_from_page(page_url, page, max_pdfs=5) -> int:
-    """Download PDFs from product detail page (max: max_pdfs)"""
+def download_all_pdfs_from_page(page_url, fetcher: Fetcher, max_pdfs=5, manifest=None, download=True) -> int:
+    """
+    Download PDFs from product detail page (max: max_pdfs).
+    Brochures are appended to `manifest` if given; `download=False` only discovers them.
+    """
     download_folder = "brochures/manulife"
     os.makedirs(download_folder, exist_ok=True)
+    state = fetcher.state
     
     try:
-        page.goto(page_url, wait_until="load", timeout=30000)
-        page.wait_for_timeout(1500)
-        
-        soup = BeautifulSoup(page.content(), 'html.parser')
-        
-        pdf_links = []
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            text = a_tag.get_text(strip=True).lower()
-            
-            url_path = href.split("?")[0].split("#")[0]
-            if url_path.lower().endswith('.pdf'):
-                
-                # Filter out irrelevant PDFs
-                if any(skip in href.lower() for skip in ['faq', 'redomiciliation', 'promotion']):
-                    continue
-                
-                # Priority: product brochures first
-                if any(kw in href.lower() or kw in text for kw in [
-                    'product', 'leaflet', 'brochure', 'benefit', 'fact', 'guide'
-                ]):
-                # these two if statements are not quite readable.
-                    priority = 1
-                else:
-                    priority = 2
-                
-                if href.startswith('http'):
-                    file_url = href
-                elif href.startswith('/'):
-                    file_url = f"{BASE_URL}{href}"
-                else:
-                    file_url = urljoin(page_url, href)
-                
-                filename = os.path.basename(urlparse(file_url).path)
-                if filename:
-                    pdf_links.append((priority, file_url, filename))
+        result = fetcher.fetch(page_url, SITE_PROFILES["manulife"])
+        if state is not None and not result.changed and state.brochures_fresh(page_url):
+            print("  [~] Unchanged since last crawl")
+            if manifest is not None:
+                manifest.extend(manifest_entry("manulife", url, page_url) for url, _ in state.brochures_for(page_url))
+            return 0
+        if not result.html:
+            result = fetcher.fetch(page_url, SITE_PROFILES["manulife"], conditional=False)
         
-        # Sort by priority and remove duplicates
-        pdf_links.sort(key=lambda x: x[0])
-        seen_files = set()
-        pdfs_to_download = []
-        for priority, url, filename in pdf_links:
-            if filename not in seen_files:
-                seen_files.add(filename)
-                pdfs_to_download.append((priority, url, filename))
-            if len(pdfs_to_download) == max_pdfs:
-                break
+        # Filter out irrelevant PDFs; product brochures first
+        candidates = extract_pdf_links(
+            result.tree, page_url, priority_re=PDF_PRIORITY_RE, skip_re=PDF_SKIP_RE, kinds=("href",),
+        )
+        pdfs_to_download = select_links(candidates, max_pdfs)
+        if state is not None:
+            state.expect_brochures(page_url, "manulife", [c.url for c in pdfs_to_download])
         
         if not pdfs_to_download:
             print(f"  [-] No PDF found")
             return 0
         
         downloaded = 0
-        for priority, file_url, filename in pdfs_to_download:
+        for candidate in pdfs_to_download:
+            file_url, filename = candidate.url, candidate.filename
             filepath = os.path.join(download_folder, filename)
+            if manifest is not None:
+                manifest.append(manifest_entry("manulife", file_url, page_url, filename))
+            if not download:
+                continue
             
             if os.path.exists(filepath):
                 print(f"  [~] {filename} (exists)")
@@ -126,6 +109,9 @@ def download_all_pdfs_from_page(page_url, page, max_pdfs=5) -> int:
             else:
                 if download_pdf_with_retry(file_url, filepath):
                     downloaded += 1
+
+            if state is not None and os.path.exists(filepath):
+                state.record_brochure(file_url, page_url, "manulife", filepath)
         
         return downloaded # weird returned value
         
@@ -133,8 +119,15 @@ def download_all_pdfs_from_page(page_url, page, max_pdfs=5) -> int:
         print(f"  [!] Error: {e}")
         return 0
 
-def scrape_health_products(list_page_url: str, max_pdfs_per_product: int=5) -> None:
-    """Main scraper function"""
+def scrape_health_products(
+    list_page_url: str, max_pdfs_per_product: int=5,
+    session=None, browser_fetch=None, manifest=None, download=True, state=None,
+) -> None:
+    """
+    Main scraper function.
+    `session` / `browser_fetch` / `state` let the orchestrator share its HTTP pool,
+    browser and crawl state.
+    """
     
     product_links = get_product_links(list_page_url)
     
@@ -144,23 +137,20 @@ def scrape_health_products(list_page_url: str, max_pdfs_per_product: int=5) -> N
     
     print(f"[✓] Found {len(product_links)} products\n")
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        
+    with crawl_state(state) as state, \
+            Fetcher(session, browser_fetch, log_path=os.path.join(FETCH_LOG_DIR, "manulife.jsonl"), state=state) as fetcher:
         total_pdfs = 0
         for i, product_url in enumerate(product_links, 1):
             product_name = product_url.split('/')[-1].replace('.html', '')
             
-            count = download_all_pdfs_from_page(product_url, page, max_pdfs=max_pdfs_per_product)
+            count = download_all_pdfs_from_page(
+                product_url, fetcher, max_pdfs=max_pdfs_per_product, manifest=manifest, download=download,
+            )
             total_pdfs += count
             
-            if i < len(product_links):
-                time.sleep(1)
-            
             print()
-        
-        browser.close()
+
+        print(f"[*] Pages served by: {dict(fetcher.stats())}")
 
 if __name__ == "__main__":
     health_vhis_url = f"{BASE_URL}/en/individual/products/health/vhis.html"
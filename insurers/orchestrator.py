@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, List
+
+from common.session import build_session
+from insurers import aia_hk, fwd, manulife, prudential
+from insurers.browser_pool import BrowserPool, WaitStrategy
+from insurers.crawl import CrawlState
+
+SITES = ("aia", "prudential", "manulife", "fwd")
+
+# Pages of the shared browser each async crawler may use at once. Prudential and
+# Manulife are sync crawlers running in a worker thread, so they fetch one page at a time.
+DEFAULT_SITE_LIMITS = {"aia": 4, "fwd": 3}
+
+DEFAULT_MANIFEST = "brochures/manifest.json"
+MANULIFE_VHIS_URL = f"{manulife.BASE_URL}/en/individual/products/health/vhis.html"
+
+
+async def crawl_site(site: str, pool: BrowserPool, session, state: CrawlState, limits: Dict[str, int],
+                     manifest: List[dict], download: bool):
+    loop = asyncio.get_running_loop()
+
+    def browser_fetch(url: str, wait: WaitStrategy) -> str:
+        # called from the sync crawlers' worker thread; renders on the shared pool
+        return asyncio.run_coroutine_threadsafe(pool.fetch_html(url, wait), loop).result()
+
+    if site == "aia":
+        roots = await asyncio.to_thread(aia_hk.find_aia_major_categories)
+        return await aia_hk.scrape_dynamic_products(
+            roots, limits.get("aia", DEFAULT_SITE_LIMITS["aia"]),
+            pool=pool, session=session, manifest=manifest, download=download, state=state,
+        )
+    if site == "fwd":
+        return await fwd.run(
+            concurrency=limits.get("fwd", DEFAULT_SITE_LIMITS["fwd"]),
+            pool=pool, session=session, manifest=manifest, download=download, state=state,
+        )
+    if site == "prudential":
+        return await asyncio.to_thread(
+            prudential.scrape_prudential_products, prudential.BASE_URL,
+            session=session, browser_fetch=browser_fetch, manifest=manifest, download=download, state=state,
+        )
+    if site == "manulife":
+        return await asyncio.to_thread(
+            manulife.scrape_health_products, MANULIFE_VHIS_URL,
+            session=session, browser_fetch=browser_fetch, manifest=manifest, download=download, state=state,
+        )
+    raise ValueError(f"Unknown site: {site}")
+
+
+def dedupe_manifest(entries: Iterable[dict]) -> List[dict]:
+    """Keeps the first entry per brochure URL, in discovery order."""
+    seen = set()
+    unique = []
+    for entry in entries:
+        if entry["source_url"] in seen:
+            continue
+        seen.add(entry["source_url"])
+        unique.append(entry)
+    return unique
+
+
+async def crawl_all(sites=SITES, browser_pages=6, http_pool=16, site_limits=None, download=True):
+    """
+    Runs the insurer crawlers concurrently over one BrowserPool of `browser_pages`
+    pages, one requests session with `http_pool` connections and one crawl state
+    (its connection is lock-guarded, so the sites and their threads share it).
+    A failing site does not stop the others. Returns the per-site summary and the
+    combined brochure manifest.
+    """
+    limits = {**DEFAULT_SITE_LIMITS, **(site_limits or {})}
+    manifest: List[dict] = []
+    summary = {}
+
+    # closed even if a crawler raises past timed() (e.g. cancellation or a browser launch failure)
+    with build_session(pool_size=http_pool) as session, CrawlState() as state:
+        # fwd keeps one page on the product list while its cards use the others
+        async with BrowserPool(size=max(browser_pages, 2)) as pool:
+            async def timed(site):
+                start = time.monotonic()
+                try:
+                    result = await crawl_site(site, pool, session, state, limits, manifest, download)
+                    summary[site] = {"status": "ok", "seconds": round(time.monotonic() - start, 1)}
+                    if isinstance(result, dict):
+                        summary[site].update(result)
+                except Exception as e:
+                    print(f"[!] {site} crawl failed: {e}")
+                    summary[site] = {"status": "error", "error": str(e), "seconds": round(time.monotonic() - start, 1)}
+
+            await asyncio.gather(*(timed(site) for site in sites))
+
+    manifest = dedupe_manifest(manifest)
+    for site in sites:
+        summary[site]["brochures"] = sum(1 for entry in manifest if entry["insurer"] == site)
+    return summary, manifest
+
+
+def write_manifest(entries: List[dict], path: str):
+    """Writes `{"brochures": [...]}`, the layout `upload_helper upload-json` reads."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"brochures": entries}, f, ensure_ascii=False, indent=2)
+
+
+def parse_limit(value: str):
+    site, _, n = value.partition("=")
+    if site not in DEFAULT_SITE_LIMITS or not n.isdigit() or int(n) < 1:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(DEFAULT_SITE_LIMITS)}=N, got {value!r}")
+    return site, int(n)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="insurers", description="Crawl all insurer sites concurrently.")
+    parser.add_argument("--sites", nargs="+", choices=SITES, default=list(SITES), help="Sites to crawl")
+    parser.add_argument("--browser-pages", type=int, default=6, help="Pages in the shared browser pool")
+    parser.add_argument("--http-pool", type=int, default=16, help="Connections in the shared HTTP pool")
+    parser.add_argument("--limit", type=parse_limit, action="append", default=[], metavar="SITE=N",
+                        help="Per-site concurrency, e.g. --limit aia=2 (repeatable)")
+    parser.add_argument("--no-download", action="store_true", help="Only discover brochures, build the manifest")
+    parser.add_argument("-o", "--output", default=DEFAULT_MANIFEST, help="Combined manifest path")
+    args = parser.parse_args(argv)
+
+    summary, manifest = asyncio.run(crawl_all(
+        args.sites, args.browser_pages, args.http_pool, dict(args.limit), not args.no_download,
+    ))
+    write_manifest(manifest, args.output)
+    print(f"[*] {len(manifest)} brochures written to {args.output}")
+    print(json.dumps(summary, indent=2))
+    return 0 if all(s["status"] == "ok" for s in summary.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,11 @@
+import argparse
 import os
-import re
-from urllib.parse import unquote, urljoin, urlparse
-
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from urllib.parse import unquote, urljoin
 
+from insurers.crawl import CrawlFrontier, canonicalize_url, compile_keywords, crawl_state, in_scope, manifest_entry
 from insurers.download_file import download_file_from_url
+from insurers.fetch import FETCH_LOG_DIR, SITE_PROFILES, Fetcher
+from insurers.links import extract_pdf_links, select_links
 
 CONFIG = {
     "non_product_keywords": {
@@ -33,122 +33,138 @@ CONFIG = {
 
 BASE_URL = "https://www.prudential.com.hk/en/products/health/"
 
-def scrape_prudential_products(root_url):
+PRODUCT_URL_RE = compile_keywords(CONFIG["product_url_keywords"])
+NON_PRODUCT_RE = compile_keywords(CONFIG["non_product_keywords"])
+PDF_PRIORITY_RE = compile_keywords(CONFIG["pdf_priority_keywords"])
+
+def scrape_prudential_products(
+    root_url, max_depth=4, max_pages=300, resume=False,
+    session=None, browser_fetch=None, manifest=None, download=True, state=None,
+):
     """
-    Scrape Prudential products using DFS traversal.
-    Navigates through pages and downloads brochures when found.
+    Scrape Prudential products with an iterative breadth-first crawl.
+    URLs are canonicalised before they enter the frontier, so query-string and
+    fragment variants of a page are loaded once; the canonical URL only keys the
+    frontier and crawl state, the page is fetched as it was linked. The visited set is persisted
+    (see CrawlFrontier), `max_depth` bounds link depth from `root_url` and
+    `max_pages` caps the number of pages fetched.
+    Pages unchanged since the last crawl (see CrawlState) reuse their recorded
+    links and skip brochure extraction.
+
+    `session` / `browser_fetch` / `state` let the orchestrator share its HTTP pool,
+    browser and crawl state; discovered brochures are appended to `manifest` if given.
     """
-    visited = set()
+    scope = canonicalize_url(BASE_URL)
+    fetched = 0
+    unchanged = 0
 
-    def dfs(current_url, page):
-        if current_url in visited or not current_url.startswith(BASE_URL):
-            return
-        
-        # Ensure we stay on the English page and within Prudential domain
-        visited.add(current_url)
-        print(f"[*] Searching in {current_url}")
+    with CrawlFrontier("prudential", resume=resume) as frontier, crawl_state(state) as state, \
+            Fetcher(session, browser_fetch, log_path=os.path.join(FETCH_LOG_DIR, "prudential.jsonl"), state=state) as fetcher:
+        frontier.push(canonicalize_url(root_url), 0, root_url)
 
-        try:
-            page.goto(current_url, wait_until="load", timeout=30000)
-            page.wait_for_timeout(2000)
-            
-            soup = BeautifulSoup(page.content(), 'html.parser')
-            
-            download_brochures(current_url, soup)
-
-            next_links = _extract_links_from_soup(soup, current_url)
-            for link in next_links:
-                dfs(link, page)
-                
-        except Exception as e:
-            print(f"[!] Error processing {current_url}: {e}")
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        dfs(root_url, page)
-        browser.close()
-
-def _extract_links_from_soup(soup, base_url):
-    """Helper to extract product links from a parsed page"""
+        while fetched < max_pages:
+            item = frontier.pop()
+            if item is None:
+                break
+            current_url, depth, fetch_url = item
+            if not in_scope(current_url, scope):
+                frontier.done(current_url)
+                continue
+
+            print(f"[*] Searching in {current_url}")
+            fetched += 1
+            try:
+                result = fetcher.fetch(fetch_url, SITE_PROFILES["prudential"], key=current_url)
+                if not result.changed and state.brochures_fresh(current_url):
+                    unchanged += 1
+                    links = state.page(current_url).links
+                    if manifest is not None:
+                        manifest.extend(manifest_entry("prudential", url, current_url) for url, _ in state.brochures_for(current_url))
+                else:
+                    if not result.html:
+                        # 304 but a brochure went missing locally
+                        result = fetcher.fetch(fetch_url, SITE_PROFILES["prudential"], conditional=False, key=current_url)
+                    download_brochures(current_url, result.tree, state=state, manifest=manifest, download=download,
+                                       base_url=fetch_url)
+                    links = _extract_links(result.tree, fetch_url, scope)
+                    state.record_links(current_url, links)
+
+                if depth < max_depth:
+                    for link in links:
+                        frontier.push(canonicalize_url(link), depth + 1, link)
+                    
+            except Exception as e:
+                print(f"[!] Error processing {current_url}: {e}")
+            frontier.done(current_url)
+
+        print(f"[*] Fetched {fetched} pages ({unchanged} unchanged), served by: {dict(fetcher.stats())}")
+
+def _extract_links(tree, base_url, scope):
+    """Helper to extract in-scope product links (absolute, as linked) from a parsed page"""
     discovered_links = set()
     
     # Look for links in navigation, product lists, and content areas
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag.get('href', '')
-        
+    for href in tree.xpath('//a/@href'):
         # Look for potential product pages based on URL patterns
-        if any(keyword in href.lower() for keyword in CONFIG['product_url_keywords']):
-            full_url = urljoin(base_url, href)
-            
-            # Filter for internal links that stay on English page and avoid non-product pages
-            if 'prudential.com.hk' in full_url and full_url.startswith(BASE_URL):
-                if not any(skip in full_url.lower() for skip in CONFIG['non_product_keywords']):
-                    discovered_links.add(full_url)
+        if not PRODUCT_URL_RE.search(href):
+            continue
+        full_url = urljoin(base_url, href).split("#")[0]
+        canonical = canonicalize_url(full_url)
+        
+        # Filter for internal links that stay on English page and avoid non-product pages
+        if in_scope(canonical, scope) and not NON_PRODUCT_RE.search(canonical):
+            discovered_links.add(full_url)
                     
     return discovered_links
 
-def download_brochures(page_url, soup, max_pdfs=5):
-    """Download PDFs from a product page"""
+def clean_filename(filename):
+    filename = unquote(filename)
+    if not filename.lower().endswith('.pdf'):
+        filename += '.pdf'
+    return filename.replace(' ', '_').replace('?', '_').replace('&', '_')
+
+def download_brochures(page_url, tree, max_pdfs=5, state=None, manifest=None, download=True, base_url=None):
+    """
+    Download PDFs from a product page, recording them in the crawl `state` and
+    `manifest` if given (with `download=False` they are only recorded).
+    Relative links resolve against `base_url`, the URL the page was fetched from
+    (default `page_url`).
+    Candidates come from one pass over the lxml tree (see insurers.links); those
+    matching the priority keywords are downloaded first.
+    """
     download_folder = "brochures/prudential"
     os.makedirs(download_folder, exist_ok=True)
     
     try:
-        pdf_links = []
-        
-        # Helper to process and add URL
-        def add_pdf_url(url):
-            full_url = urljoin(page_url, url)
-            
-            # Clean filename
-            filename = os.path.basename(urlparse(full_url).path)
-            if filename and filename != '/':
-                if not filename.lower().endswith('.pdf'):
-                    filename += '.pdf'
-                pdf_links.append((full_url, filename))
-
-        # 1. <a> tags
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            url_path = href.split("?")[0].split("#")[0]
-            if url_path.lower().endswith('.pdf'):
-                add_pdf_url(href)
-        
-        # 2. data-href attributes
-        for element in soup.find_all(attrs={"data-href": True}):
-            href = element.get('data-href', '')
-            if href.lower().endswith('.pdf'):
-                add_pdf_url(href)
-        
-        # 3. onclick attributes
-        for element in soup.find_all(attrs={"onclick": True}):
-            onclick = element.get('onclick', '')
-            if '.pdf' in onclick.lower():
-                pdf_urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))*\.pdf', onclick)
-                for pdf_url in pdf_urls:
-                    add_pdf_url(pdf_url)
+        candidates = extract_pdf_links(tree, base_url or page_url, priority_re=PDF_PRIORITY_RE)
+        pdfs_to_download = select_links(candidates, max_pdfs, key=lambda c: clean_filename(c.filename))
+        if state is not None:
+            state.expect_brochures(page_url, "prudential", [c.url for c in pdfs_to_download])
         
-        # Remove duplicates
-        seen_files = set()
-        pdfs_to_download = []
-        for url, filename in pdf_links:
-            clean_filename = unquote(filename).replace(' ', '_').replace('?', '_').replace('&', '_')
-            if clean_filename not in seen_files:
-                seen_files.add(clean_filename)
-                pdfs_to_download.append((url, clean_filename))
-            if len(pdfs_to_download) == max_pdfs:
-                break     
-        
-        for file_url, filename in pdfs_to_download:
+        for candidate in pdfs_to_download:
+            filename = clean_filename(candidate.filename)
             filepath = os.path.join(download_folder, filename)
+            if manifest is not None:
+                manifest.append(manifest_entry("prudential", candidate.url, page_url, filename))
+            if not download:
+                continue
             
             if os.path.exists(filepath):
                 print(f"  [~] {filename} (exists)")
             else:
-                download_file_from_url(file_url, filepath)
+                download_file_from_url(candidate.url, filepath)
+
+            if state is not None and os.path.exists(filepath):
+                state.record_brochure(candidate.url, page_url, "prudential", filepath)
          
     except Exception as e:
         print(f"  [!] Error processing page: {e}")
 
 if __name__ == "__main__":
-    scrape_prudential_products(BASE_URL)
+    parser = argparse.ArgumentParser(description="Download Prudential product brochures.")
+    parser.add_argument("--max-depth", type=int, default=4, help="Max link depth from the root page")
+    parser.add_argument("--max-pages", type=int, default=300, help="Max number of pages to fetch")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted crawl")
+    args = parser.parse_args()
+
+    scrape_prudential_products(BASE_URL, args.max_depth, args.max_pages, args.resume)
@@ -1,12 +1,23 @@
 import argparse
+import asyncio
+import hashlib
 import os
+import queue
 import re
-from io import StringIO
+import sys
+import threading
 from urllib.parse import urljoin, urlparse
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
+import lxml.html
+
+from html_tables import extract_tables
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insurers.crawl import canonicalize_url
+from common.session import build_session
+from common.workbooks import ingest
 
 # --------------------------------------
 # Configuration
@@ -14,7 +25,9 @@ from bs4 import BeautifulSoup
 OUTPUT_DIR = "./separate_tables"
 ATTACH_DIR = os.path.join(OUTPUT_DIR, "attachments")
 FORMATS = [".pdf", ".xls", ".xlsx", ".csv", ".doc", ".docx"]
-used_names = set()
+CONCURRENCY = 8  # pages fetched at once
+PER_HOST_LIMIT = 4  # open connections per host
+DOWNLOAD_WORKERS = 4  # attachment downloads in flight
 
 # --------------------------------------
 # Helper Functions
@@ -23,14 +36,12 @@ used_names = set()
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
-def extract_page_title(soup):
+def extract_page_title(tree):
     """Get readable page title (using <h1> first, <title> second)."""
-    h1 = soup.find("h1")
-    if h1 and h1.get_text(strip=True):
-        return h1.get_text(strip=True)
-    title_tag = soup.find("title")
-    if title_tag and title_tag.get_text(strip=True):
-        return title_tag.get_text(strip=True)
+    for tag_name in ("h1", "title"):
+        tag = next(tree.iter(tag_name), None)
+        if tag is not None and tag.text_content().strip():
+            return tag.text_content().strip()
     return "Untitled"
 
 
@@ -41,16 +52,34 @@ def clean_file_name(raw_text):
     return raw_text or "file"
 
 
+class FilenameRegistry:
+    """
+    Hands out unique file names (`name`, `name_2`, `name_3`, ...) for one output
+    folder. Safe to use from the crawler's worker and download threads.
+    """
+
+    def __init__(self):
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def reserve(self, base_name, extension):
+        base = clean_file_name(base_name)
+        name = base
+        counter = 2
+        with self._lock:
+            while f"{name}{extension}" in self._names:
+                name = f"{base}_{counter}"
+                counter += 1
+            self._names.add(f"{name}{extension}")
+        return f"{name}{extension}"
+
+
+filenames = FilenameRegistry()
+
+
 def get_unique_filename(base_name, extension):
     """Prevent duplicate names in the same folder."""
-    base = clean_file_name(base_name)
-    name = base
-    counter = 2
-    while f"{name}{extension}" in used_names: # weird way to write but okay
-        name = f"{base}_{counter}"
-        counter += 1
-    used_names.add(f"{name}{extension}")
-    return f"{name}{extension}"
+    return filenames.reserve(base_name, extension)
 
 
 def clean_table(df):
@@ -65,107 +94,228 @@ def normalize_url(url):
     return url.split("#")[0].rstrip("/").strip()
 
 
-def resolve_final_url(url):
-    """Follow redirects if needed."""
-    try:
-        response = requests.head(url, allow_redirects=True, timeout=10)
-        if response.status_code in (301, 302, 303, 307, 308):
-            return response.headers.get("Location", url)
-        return response.url
-    except Exception:
-        return url
-
+class AttachmentQueue:
+    """
+    Background download queue for attached PDF/Excel/CSV files.
+    `workers` threads share one pooled session. A file linked from several pages
+    is queued once (by canonical URL) and fetched from the URL it was linked as;
+    a file served under several URLs is kept once (by SHA-256 of its content).
+    `saved` maps each canonical URL to its path.
+    """
+
+    def __init__(self, workers=DOWNLOAD_WORKERS):
+        self.saved = {}
+        self._queued = set()
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._session = build_session(pool_size=workers)
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, file_url, page_title):
+        """Queues a download unless the URL was already queued; returns True if queued."""
+        url = canonicalize_url(file_url)
+        with self._lock:
+            if url in self._queued:
+                return False
+            self._queued.add(url)
+        self._queue.put((url, file_url, page_title))
+        return True
+
+    def close(self):
+        """Waits for queued downloads to finish and stops the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._session.close()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            url, file_url, page_title = item
+            try:
+                path = self._download(file_url, page_title)
+                if path:
+                    with self._lock:
+                        self.saved[url] = path
+            except Exception as e:
+                print(f"[!] Failed to download {file_url}: {e}")
 
-def download_attachment(file_url, page_title):
-    """Download attached PDF/Excel/CSV file."""
-    try:
+    def _download(self, file_url, page_title):
+        """Download attached PDF/Excel/CSV file; a copy of a known file is discarded."""
         file_name = os.path.basename(urlparse(file_url).path)
         if not file_name:
             return None
 
-        base_name, ext = os.path.splitext(file_name)
-        combined_name = f"{page_title}_{base_name}"
-        clean_name = get_unique_filename(combined_name, ext)
-        save_path = os.path.join(ATTACH_DIR, clean_name)
-
-        response = requests.get(file_url, stream=True, timeout=15)
-        response.raise_for_status()
-        with open(save_path, "wb") as f:
-            for chunk in response.iter_content(8192):
-                f.write(chunk)
-
-        return save_path
-
-    except Exception as e:
-        return
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(ATTACH_DIR, f".{threading.get_ident()}.part")
+        try:
+            with self._session.get(file_url, stream=True, timeout=15) as response:
+                response.raise_for_status()
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(65536):
+                        digest.update(chunk)
+                        f.write(chunk)
+
+            content_hash = digest.hexdigest()
+            with self._lock:
+                existing = self._hashes.get(content_hash)
+                if existing is None:
+                    base_name, ext = os.path.splitext(file_name)
+                    save_path = os.path.join(ATTACH_DIR, get_unique_filename(f"{page_title}_{base_name}", ext))
+                    self._hashes[content_hash] = save_path
+            if existing is not None:
+                print(f"[~] Duplicate of {os.path.basename(existing)}: {file_url}")
+                return existing
+
+            os.replace(tmp_path, save_path)
+            return save_path
+        finally:
+            # a failed or duplicate download leaves nothing behind
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
 
 # --------------------------------------
 # Main crawler
 # --------------------------------------
 
-def crawl_page(url, depth, max_depth, visited):
-    """Recursively crawl pages to extract tables and attachments."""
-    if depth > max_depth:
-        return
+def is_attachment(url):
+    path = urlparse(url).path.lower()
+    return any(path.endswith(ext) for ext in FORMATS)
 
-    url = normalize_url(url)
-    if url in visited:
-        return
-    visited.add(url)
 
+def save_tables(tree, page_title, url, parquet=False):
+    """
+    Extract and save the page's (non-nested) HTML tables as CSV, and as Parquet
+    next to it if `parquet` is set. Tables are built from the page's lxml tree.
+    """
     try:
-        response = requests.get(url, timeout=15)
+        tables = extract_tables(tree)
+    except Exception as e:
+        print(f"[!] Failed to parse tables at {url}: {e}")
+        return
+
+    for caption_text, df in tables:
+        try:
+            df = clean_table(df)
+            filename_base = f"{page_title}_{caption_text}"
+            filename = get_unique_filename(filename_base, ".csv")
+            filepath = os.path.join(OUTPUT_DIR, filename)
+
+            df.to_csv(filepath, index=False, encoding="utf-8-sig")
+            if parquet:
+                df.to_parquet(os.path.splitext(filepath)[0] + ".parquet", index=False)
+        except Exception as e:
+            print(f"[!] Failed to save table at {url}: {e}")
+
+
+def process_page(url, html, attachments, parquet=False):
+    """
+    Saves the tables of a fetched page, hands its attachments to the
+    `attachments` queue and returns the (normalized) page links to crawl next.
+    Runs in a worker thread. Links are classified in a single pass over the anchors.
+    """
+    tree = lxml.html.fromstring(html)
+    page_title = extract_page_title(tree)
+    save_tables(tree, page_title, url, parquet)
+
+    links = []
+    for href in tree.xpath("//a/@href"):
+        full_url = urljoin(url, href.strip())
+        if urlparse(full_url).scheme not in ("http", "https"):
+            continue
+        if is_attachment(full_url):
+            attachments.submit(full_url, page_title)
+        else:
+            links.append(normalize_url(full_url))
+    return links
+
+
+async def fetch_page(session, url):
+    """
+    GET following redirects; returns (final url, html), or (final url, None) for
+    non-HTML responses. The final URL comes from the same request, so links
+    need no separate HEAD round trip to resolve redirects.
+    """
+    async with session.get(url, allow_redirects=True) as response:
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        page_title = extract_page_title(soup)
-
-        # --- Extract and save HTML tables ---
-        tables = soup.find_all("table")
-        for table in tables:
-            if table.find("table"):  # skip nested tables
-                continue
+        final_url = normalize_url(str(response.url))
+        if "html" not in response.headers.get("Content-Type", ""):
+            return final_url, None
+        return final_url, await response.text(errors="replace")
+
+
+async def crawl(base_url, max_depth, attachments, concurrency=CONCURRENCY, per_host=PER_HOST_LIMIT, parquet=False):
+    """
+    Breadth-first crawl from `base_url` down to `max_depth`.
+    A deduplicated frontier is shared by `concurrency` workers; a link is queued
+    at most once, and a redirect target already seen is not processed again.
+    Connections per host are capped at `per_host`; with `parquet` tables are also
+    written as Parquet. Returns the visited URLs.
+    """
+    frontier = asyncio.Queue()
+    seen = {normalize_url(base_url)}
+    processed = set()
+    frontier.put_nowait((normalize_url(base_url), 0))
+
+    async def worker(session):
+        while True:
+            url, depth = await frontier.get()
             try:
-                df_list = pd.read_html(StringIO(str(table)), header=0)
-                df = clean_table(df_list[0])
-
-                caption_tag = table.find("caption")
-                caption_text = caption_tag.get_text(strip=True) if caption_tag else "Table"
-
-                filename_base = f"{page_title}_{caption_text}"
-                filename = get_unique_filename(filename_base, ".csv")
-                filepath = os.path.join(OUTPUT_DIR, filename)
-
-                df.to_csv(filepath, index=False, encoding="utf-8-sig")
+                final_url, html = await fetch_page(session, url)
+                if html is None or final_url in processed:
+                    continue
+                processed.add(final_url)
+                seen.add(final_url)
+                print(f"[*] Depth {depth}: {final_url}")
+
+                links = await asyncio.to_thread(process_page, final_url, html, attachments, parquet)
+                if depth < max_depth:  # early termination (save queueing time)
+                    for link in links:
+                        if link not in seen:
+                            seen.add(link)
+                            frontier.put_nowait((link, depth + 1))
             except Exception as e:
-                print(f"[!] Failed to parse table at {url}: {e}")
-
-        # --- Download linked PDF/Excel/CSV attachments ---
-        for a in soup.find_all("a", href=True):
-            href = a["href"].strip()
-            if any(href.lower().endswith(ext) for ext in FORMATS):
-                file_url = urljoin(url, href)
-                download_attachment(file_url, page_title)
-
-        # --- Recurse into linked pages if within depth ---
-        if depth + 1 <= max_depth: # early termination (save parsing time)
-            for a in soup.find_all("a", href=True):
-                href = a["href"].strip()
-                full_url = urljoin(url, href)
-                if not any(full_url.lower().endswith(ext) for ext in FORMATS):
-                    final_url = resolve_final_url(full_url)
-                    crawl_page(final_url, depth + 1, max_depth, visited)
-
-    except Exception as e:
-        pass
-
-
-def run_table_scrape(base_url, max_depth=1):
-    """Main driver function."""
+                print(f"[!] Failed to crawl {url}: {e}")
+            finally:
+                frontier.task_done()
+
+    timeout = aiohttp.ClientTimeout(total=15)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        try:
+            await frontier.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    return processed
+
+
+def run_table_scrape(
+    base_url, max_depth=1, concurrency=CONCURRENCY, per_host=PER_HOST_LIMIT,
+    parquet=False, download_workers=DOWNLOAD_WORKERS,
+):
+    """
+    Main driver function. Attachments download in the background while the
+    crawl continues; returns once both are done.
+    """
     ensure_dir(OUTPUT_DIR)
     ensure_dir(ATTACH_DIR)
-    visited = set()
-    crawl_page(base_url, 0, max_depth, visited)
+    attachments = AttachmentQueue(download_workers)
+    try:
+        visited = asyncio.run(crawl(base_url, max_depth, attachments, concurrency, per_host, parquet))
+    finally:
+        attachments.close()
+    print(f"[*] {len(visited)} pages, {len(set(attachments.saved.values()))} attachments saved")
+    return visited
 
 # --------------------------------------
 # CLI entry point
@@ -177,9 +327,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scrape tables and attachments (PDF/Excel/CSV) into CSV files.")
     parser.add_argument("url", help="Starting URL to scrape", nargs='?', default=default_entry)
     parser.add_argument("depth", type=int, help="Max recursion depth (e.g. 1, 2, 3)", nargs='?', default=3)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Pages fetched at once")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT, help="Max connections per host")
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS, help="Attachment downloads in flight")
+    parser.add_argument("--parquet", action="store_true", help="Also write each table as Parquet (needs pyarrow)")
+    parser.add_argument("--ingest", action="store_true", help="Ingest new Excel attachments into the workbook Parquet store")
     args = parser.parse_args()
 
     url = args.url.strip() if args.url else input("Enter the starting URL: ").strip()
     depth = args.depth if args.depth else int(input("Enter max depth (e.g. 1, 2, 3): ").strip())
 
-    run_table_scrape(url, max_depth=depth)
\ No newline at end of file
+    run_table_scrape(url, max_depth=depth, concurrency=args.concurrency, per_host=args.per_host,
+                     parquet=args.parquet, download_workers=args.download_workers)
+    if args.ingest:
+        ingest({"chp": ATTACH_DIR})
\ No newline at end of file
@@ -0,0 +1,112 @@
+import re
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+# Tables that contain another table are layout, not data.
+DATA_TABLES_XPATH = "//table[not(.//table)]"
+NUMBER_RE = re.compile(r"^[-+]?(?:\d+|\d{1,3}(?:,\d{3})+)(?:\.\d+)?$")
+
+
+def _cell_text(cell) -> Optional[str]:
+    text = " ".join(cell.text_content().split())
+    return text or None
+
+
+def _span(cell, name: str) -> int:
+    try:
+        return max(int(cell.get(name, 1)), 1)
+    except ValueError:
+        return 1
+
+
+def _rows(table):
+    """The table's own rows in document order (thead, tbody, tfoot or bare tr)."""
+    return table.xpath("./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr")
+
+
+def table_grid(table) -> List[List[Optional[str]]]:
+    """
+    Lays out an lxml <table> as a rectangular grid of cell texts.
+    A cell with rowspan/colspan fills every position it covers, so merged
+    headers and grouped rows repeat their value as `pd.read_html` does.
+    """
+    grid = []
+    pending = {}  # column -> (text, rows still to fill below)
+    for tr in _rows(table):
+        row = []
+        col = 0
+        cells = iter(tr.xpath("./td | ./th"))
+        cell = next(cells, None)
+        while cell is not None or any(c >= col for c in pending):
+            if col in pending:
+                text, left = pending[col]
+                row.append(text)
+                if left == 1:
+                    del pending[col]
+                else:
+                    pending[col] = (text, left - 1)
+                col += 1
+                continue
+            if cell is None:
+                row.append(None)
+                col += 1
+                continue
+            text = _cell_text(cell)
+            rowspan, colspan = _span(cell, "rowspan"), _span(cell, "colspan")
+            for _ in range(colspan):
+                row.append(text)
+                if rowspan > 1:
+                    pending[col] = (text, rowspan - 1)
+                col += 1
+            cell = next(cells, None)
+        grid.append(row)
+
+    width = max((len(row) for row in grid), default=0)
+    return [row + [None] * (width - len(row)) for row in grid]
+
+
+def _unique_columns(names) -> List[str]:
+    """Header labels made unique the way pandas does (`a`, `a.1`, ...)."""
+    seen = {}
+    columns = []
+    for i, name in enumerate(names):
+        name = name if name is not None else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _coerce_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts columns whose non-empty cells are all numbers (thousands separators allowed)."""
+    for column in df.columns:
+        values = df[column].dropna()
+        if len(values) and all(NUMBER_RE.match(v) for v in values):
+            df[column] = pd.to_numeric(df[column].str.replace(",", "", regex=False))
+    return df
+
+
+def table_to_frame(table) -> Optional[pd.DataFrame]:
+    """DataFrame of a table with its first row as header, or None if the table is empty."""
+    grid = table_grid(table)
+    if not grid:
+        return None
+    df = pd.DataFrame(grid[1:], columns=_unique_columns(grid[0]))
+    return _coerce_numeric(df)
+
+
+def extract_tables(tree) -> List[Tuple[str, pd.DataFrame]]:
+    """(caption, DataFrame) for every data table of a parsed page; caption defaults to "Table"."""
+    tables = []
+    for table in tree.xpath(DATA_TABLES_XPATH):
+        df = table_to_frame(table)
+        if df is None:
+            continue
+        caption = table.find("caption")
+        caption_text = _cell_text(caption) if caption is not None else None
+        tables.append((caption_text or "Table", df))
+    return tables
@@ -0,0 +1,86 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from insurers.crawl import CrawlFrontier, CrawlState, canonicalize_url, in_scope
+
+
+def test_canonicalize_url_merges_variants_of_a_page():
+    assert canonicalize_url("HTTPS://WWW.Example.com:443//en/plans/?utm_source=x&b=2&a=1#top") == \
+        "https://www.example.com/en/plans?a=1&b=2"
+    assert canonicalize_url("https://example.com/en/plans/") == canonicalize_url("https://example.com/en/plans")
+    assert canonicalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_canonicalize_url_keeps_encoding_and_ipv6_hosts():
+    assert canonicalize_url("https://example.com/a?q=two%20words") == "https://example.com/a?q=two%20words"
+    assert canonicalize_url("https://[::1]:8080/a") == "https://[::1]:8080/a"
+    assert canonicalize_url("https://[::1]/a/") == "https://[::1]/a"
+
+
+def test_in_scope():
+    assert in_scope("https://example.com/en/products", "https://example.com/en/products")
+    assert in_scope("https://example.com/en/products/health", "https://example.com/en/products")
+    assert not in_scope("https://example.com/en/products-old", "https://example.com/en/products")
+
+
+def test_frontier_fetches_the_url_as_linked(tmp_path):
+    with CrawlFrontier("test", str(tmp_path / "crawl.sqlite3")) as frontier:
+        linked = "https://example.com/en/plans/?utm_source=x"
+        assert frontier.push(canonicalize_url(linked), 0, linked)
+        assert not frontier.push(canonicalize_url("https://example.com/en/plans"), 0, "https://example.com/en/plans")
+        assert frontier.pop() == ("https://example.com/en/plans", 0, linked)
+        assert frontier.pop() is None
+
+
+def test_frontier_and_state_share_one_database(tmp_path):
+    path = str(tmp_path / "crawl.sqlite3")
+    with CrawlFrontier("test", path) as frontier, CrawlState(path) as state:
+        assert frontier.push("https://example.com", 0)
+        url, depth, fetch_url = frontier.pop()
+        assert fetch_url == url
+        assert state.record_page(url, "test", "<html><a href='/a.pdf'>a</a></html>")
+        state.record_brochure("https://example.com/a.pdf", url, "test", None)
+        assert frontier.push("https://example.com/b", depth + 1)
+        assert not frontier.push("https://example.com/b", depth + 1)
+        frontier.done(url)
+
+        # a third connection sees everything both have written
+        with sqlite3.connect(path, timeout=0) as db:
+            assert db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0] == 2
+            assert db.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 1
+
+    with CrawlFrontier("test", path, resume=True) as frontier:
+        assert frontier.pop() == ("https://example.com/b", 1, "https://example.com/b")
+
+
+def test_only_one_worker_sees_a_page_change(tmp_path):
+    with CrawlState(str(tmp_path / "crawl.sqlite3")) as state:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            changed = list(pool.map(lambda _: state.record_page("https://example.com", "test", "<html/>"), range(32)))
+        assert changed.count(True) == 1
+
+
+def test_brochures_fresh_only_once_every_selected_brochure_is_on_disk(tmp_path):
+    page = "https://example.com/plan"
+    brochure = tmp_path / "a.pdf"
+    with CrawlState(str(tmp_path / "crawl.sqlite3")) as state:
+        state.record_page(page, "test", "<html>v1</html>")
+        assert not state.brochures_fresh(page)  # brochures not selected yet
+
+        state.expect_brochures(page, "test", ["https://example.com/a.pdf", "https://example.com/b.pdf"])
+        assert not state.brochures_fresh(page)
+
+        brochure.write_bytes(b"%PDF")
+        state.record_brochure("https://example.com/a.pdf", page, "test", str(brochure))
+        assert not state.brochures_fresh(page)  # b.pdf still pending
+
+        state.expect_brochures(page, "test", ["https://example.com/a.pdf"])
+        state.record_brochure("https://example.com/a.pdf", page, "test", str(brochure))
+        assert state.brochures_fresh(page)
+        assert state.brochures_for(page) == [("https://example.com/a.pdf", str(brochure))]
+
+        assert state.record_page(page, "test", "<html>v2</html>")
+        assert not state.brochures_fresh(page)
+
+        state.expect_brochures(page, "test", [])
+        assert state.brochures_fresh(page)
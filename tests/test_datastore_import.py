@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "google-vertexai"))
+
+from datastore_import import failed_uris, make_batches
+
+BATCH = ["gs://b/x.pdf", "gs://b/y.pdf", "gs://b/z.pdf"]
+
+
+def test_failed_uris_strips_trailing_punctuation():
+    errors = ["Failed gs://b/x.pdf: bad", "Cannot read 'gs://b/z.pdf'.", "Unsupported gs://b/y.pdf;"]
+    assert failed_uris(BATCH, errors[:2], 2) == ["gs://b/x.pdf", "gs://b/z.pdf"]
+    assert failed_uris(BATCH, errors, 3) == BATCH
+
+
+def test_failed_uris_returns_the_whole_batch_when_samples_are_incomplete():
+    assert failed_uris(BATCH, ["Failed gs://b/x.pdf."], 2) == BATCH
+    assert failed_uris(BATCH, ["quota exceeded"], 1) == BATCH
+    assert failed_uris(BATCH, ["Failed gs://other/x.pdf"], 1) == BATCH
+
+
+def test_make_batches_by_count():
+    uris = [f"gs://b/{i}.pdf" for i in range(5)]
+    assert make_batches(uris, 2) == [uris[0:2], uris[2:4], uris[4:]]
+    assert make_batches([], 2) == []
+
+
+def test_make_batches_by_size():
+    uris = ["gs://b/a", "gs://b/b", "gs://b/c", "gs://b/d"]
+    sizes = {"gs://b/a": 60, "gs://b/b": 50, "gs://b/c": 40, "gs://b/d": None}
+    assert make_batches(uris, 10, 100, sizes) == [["gs://b/a"], ["gs://b/b", "gs://b/c", "gs://b/d"]]
+    # a file over the byte bound still gets a batch of its own
+    assert make_batches(["gs://b/a"], 10, 10, sizes) == [["gs://b/a"]]
@@ -0,0 +1,22 @@
+import requests
+
+from insurers.fetch import parse_html
+
+
+def response(body: bytes, encoding=None) -> requests.Response:
+    r = requests.models.Response()
+    r._content = body
+    r.encoding = encoding
+    return r
+
+
+def test_parse_html_returns_none_for_empty_bodies():
+    assert parse_html(response(b"")) is None
+    assert parse_html(response(b"  \n")) is None
+
+
+def test_parse_html_accepts_an_xml_declaration_and_the_response_encoding():
+    body = '<?xml version="1.0" encoding="utf-8"?><html><body><a href="/a.pdf">Brochure é</a></body></html>'
+    assert parse_html(response(body.encode("utf-8"), "utf-8")).xpath("//a/text()") == ["Brochure é"]
+    big5 = "<html><body><p>保險</p></body></html>".encode("big5")
+    assert parse_html(response(big5, "big5")).xpath("//p/text()") == ["保險"]
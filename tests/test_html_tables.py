@@ -0,0 +1,83 @@
+import os
+import sys
+
+import lxml.html
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "medical"))
+
+from html_tables import extract_tables, table_grid
+
+
+def grid(html):
+    return table_grid(lxml.html.fromstring(html))
+
+
+def test_merged_headers_repeat_over_the_cells_they_cover():
+    assert grid("""
+        <table>
+          <thead>
+            <tr><th rowspan="2">Item</th><th colspan="2">2023</th><th rowspan="2">Total</th></tr>
+            <tr><th>H1</th><th>H2</th></tr>
+          </thead>
+          <tbody><tr><td>Beds</td><td>1</td><td>2</td><td>3</td></tr></tbody>
+        </table>
+    """) == [
+        ["Item", "2023", "2023", "Total"],
+        ["Item", "H1", "H2", "Total"],
+        ["Beds", "1", "2", "3"],
+    ]
+
+
+def test_row_groups_fill_the_rows_below():
+    assert grid("""
+        <table>
+          <tr><th>Region</th><th>District</th><th>Clinics</th></tr>
+          <tr><td rowspan="3">Kowloon</td><td>Yau Tsim</td><td>4</td></tr>
+          <tr><td>Mong Kok</td><td>5</td></tr>
+          <tr><td>Sham Shui Po</td><td>6</td></tr>
+          <tr><td>Islands</td><td>Lantau</td><td>2</td></tr>
+        </table>
+    """) == [
+        ["Region", "District", "Clinics"],
+        ["Kowloon", "Yau Tsim", "4"],
+        ["Kowloon", "Mong Kok", "5"],
+        ["Kowloon", "Sham Shui Po", "6"],
+        ["Islands", "Lantau", "2"],
+    ]
+
+
+def test_a_cell_spanning_rows_and_columns_and_ragged_rows():
+    assert grid("""
+        <table>
+          <tr><td rowspan="2" colspan="2">A</td><td>b</td></tr>
+          <tr><td>c</td></tr>
+          <tr><td>d</td></tr>
+          <tr><td>e</td><td colspan="0">f</td><td rowspan="x">g</td></tr>
+        </table>
+    """) == [
+        ["A", "A", "b"],
+        ["A", "A", "c"],
+        ["d", None, None],
+        ["e", "f", "g"],
+    ]
+
+
+def test_extract_tables_skips_layout_tables_and_types_numbers():
+    tree = lxml.html.fromstring("""
+        <html><body><table><tr><td>
+          <table>
+            <caption> Beds  by year </caption>
+            <tr><th>Year</th><th colspan="2">Beds</th></tr>
+            <tr><td>2022</td><td>1,200</td><td>n/a</td></tr>
+            <tr><td>2023</td><td>1,350.5</td><td></td></tr>
+          </table>
+        </td></tr></table></body></html>
+    """)
+    tables = extract_tables(tree)
+    assert len(tables) == 1
+    caption, df = tables[0]
+    assert caption == "Beds by year"
+    assert list(df.columns) == ["Year", "Beds", "Beds.1"]
+    assert df["Year"].tolist() == [2022, 2023]
+    assert df["Beds"].tolist() == [1200.0, 1350.5]
+    assert df["Beds.1"].tolist()[0] == "n/a"
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "financial"))
+
+from incremental import append_new_rows, latest_date, stable_ids
+
+KEY = ["record_date", "security_desc"]
+
+
+def test_stable_ids_depend_only_on_dataset_and_key():
+    df = pd.DataFrame({"record_date": ["2024-01-31", "2024-01-31"], "security_desc": ["Bills", "Notes"], "rate": [5.1, 4.2]})
+    ids = stable_ids(df, "treasury", KEY)
+    assert ids.tolist() == stable_ids(df.assign(rate=[0.0, 0.0]), "treasury", KEY).tolist()
+    assert ids.nunique() == 2
+    assert ids.tolist() != stable_ids(df, "other", KEY).tolist()
+    # same row, same id, wherever it sits in the frame
+    assert stable_ids(df.iloc[::-1], "treasury", KEY).tolist() == ids.tolist()[::-1]
+
+
+def test_append_new_rows_replaces_rows_by_key_and_sorts_newest_first():
+    existing = pd.DataFrame({  # as read back from the CSV
+        "record_date": ["2024-01-31", "2024-02-29"],
+        "security_desc": ["Bills", "Bills"],
+        "rate": [5.1, 5.2],
+    })
+    new = pd.DataFrame({  # as parsed from the API
+        "record_date": pd.to_datetime(["2024-02-29", "2024-03-31"]),
+        "security_desc": ["Bills", "Bills"],
+        "rate": [5.25, 5.3],
+    })
+    combined = append_new_rows(existing, new, "record_date", KEY)
+    assert combined["record_date"].tolist() == ["2024-03-31", "2024-02-29", "2024-01-31"]
+    assert combined["rate"].tolist() == [5.3, 5.25, 5.1]
+
+
+def test_incremental_and_full_runs_give_the_same_ids():
+    rows = pd.DataFrame({"record_date": ["2024-03-31", "2024-02-29", "2024-01-31"], "security_desc": ["Bills"] * 3, "rate": [1.0, 2.0, 3.0]})
+    full = append_new_rows(None, rows, "record_date", KEY)
+    incremental = append_new_rows(rows.iloc[1:], rows.iloc[:1], "record_date", KEY)
+    pd.testing.assert_frame_equal(full, incremental)
+    assert stable_ids(full, "treasury", KEY).tolist() == stable_ids(incremental, "treasury", KEY).tolist()
+
+
+def test_latest_date():
+    assert latest_date(None, "record_date") is None
+    assert latest_date(pd.DataFrame({"other": [1]}), "record_date") is None
+    assert latest_date(pd.DataFrame({"record_date": ["2024-01-31", "2024-03-01", "bad"]}), "record_date") == "2024-03-01"
@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "financial"))
+
+from pagination import fetch_all_pages, iter_pages
+
+
+def fake_source(records, pagesize, report_total=True, delay=None):
+    """fetch_page over `records`; `delay(page)` slows pages down to shuffle completion order."""
+    requested = []
+    lock = threading.Lock()
+
+    def fetch_page(page):
+        with lock:
+            requested.append(page)
+        if delay:
+            time.sleep(delay(page))
+        rows = records[(page - 1) * pagesize:page * pagesize]
+        return rows, len(rows), len(records) if report_total else None
+
+    return fetch_page, requested
+
+
+def test_known_total_requests_exactly_the_pages_needed_in_order():
+    records = list(range(23))
+    fetch_page, requested = fake_source(records, 5, delay=lambda page: 0.02 if page == 2 else 0)
+    pages = list(iter_pages(fetch_page, 5, concurrency=4))
+    assert pages == [records[i:i + 5] for i in range(0, 23, 5)]
+    assert sorted(requested) == [1, 2, 3, 4, 5]
+
+
+def test_unknown_total_stops_at_the_first_short_page():
+    records = list(range(12))
+    fetch_page, requested = fake_source(records, 5, report_total=False)
+    assert fetch_all_pages(fetch_page, 5, concurrency=4) == [records[0:5], records[5:10], records[10:12]]
+    # at most one wave of `concurrency` pages is requested past page 1; later pages never are
+    assert {1, 2, 3} <= set(requested) <= {1, 2, 3, 4, 5}
+
+
+def test_unknown_total_with_an_exact_multiple_ends_on_an_empty_page():
+    records = list(range(10))
+    fetch_page, _ = fake_source(records, 5, report_total=False)
+    assert fetch_all_pages(fetch_page, 5, concurrency=2) == [records[0:5], records[5:10]]
+
+
+def test_max_pages_and_empty_first_page():
+    records = list(range(50))
+    fetch_page, requested = fake_source(records, 5, report_total=False)
+    assert len(fetch_all_pages(fetch_page, 5, max_pages=3, concurrency=4)) == 3
+    assert max(requested) == 3
+
+    fetch_page, _ = fake_source(records, 5)
+    assert len(fetch_all_pages(fetch_page, 5, max_pages=2)) == 2
+    assert fetch_all_pages(fake_source([], 5)[0], 5) == []
+    assert fetch_all_pages(fake_source([1, 2], 5)[0], 5) == [[1, 2]]
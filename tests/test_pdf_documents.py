@@ -0,0 +1,35 @@
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "google-vertexai"))
+
+from pdf_documents import chunk_pages
+
+ANCHOR_RE = re.compile(r"\[page (\d+)\]\n")
+
+
+def test_chunks_stay_within_max_chars_and_every_piece_is_anchored():
+    pages = ["", "", "x" * 5000, "short line\n" + "y" * 1500 + "\nlast line", "z"]
+    chunks = list(chunk_pages(pages, 1000))
+
+    assert all(len(text) <= 1000 for _, _, text in chunks)
+    for first, last, text in chunks:
+        assert text.startswith(f"[page {first}]\n")
+        anchored = [int(n) for n in ANCHOR_RE.findall(text)]
+        assert anchored[0] == first and anchored[-1] == last
+        assert all(piece.startswith("[page ") for piece in text.split("\n\n"))
+
+    # nothing is lost: every page's text comes back once its anchors are removed
+    text_of = {}
+    for _, _, text in chunks:
+        for piece in text.split("\n\n"):
+            number, body = ANCHOR_RE.match(piece).group(1), ANCHOR_RE.sub("", piece, count=1)
+            text_of.setdefault(int(number), []).append(body)
+    assert "".join(text_of[3]) == "x" * 5000
+    assert "".join(text_of[4]).replace("\n", "") == ("short line" + "y" * 1500 + "last line")
+    assert 1 not in text_of and 2 not in text_of
+
+
+def test_short_pages_share_a_chunk():
+    assert list(chunk_pages(["one", "two"], 1000)) == [(1, 2, "[page 1]\none\n\n[page 2]\ntwo")]
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from census.us_health_insurance_coverage import to_long
+
+
+def test_to_long_pairs_estimates_and_margins_and_drops_annotations():
+    df = pd.DataFrame([
+        ["0400000US06", "California", "39000000", "12000", "-", "1500000", "-555555555", "3.9", "*****"],
+        ["0400000US36", "New York", "19500000", "8000", "-", "950000", "7000", "4.9", "0.2"],
+    ], columns=[
+        "GEO_ID", "NAME",
+        "S2701_C01_001E", "S2701_C01_001M", "S2701_C01_001EA",
+        "S2701_C04_001E", "S2701_C04_001M",
+        "S2701_C05_001E", "S2701_C05_001M",
+    ])
+    long = to_long(df, "S2701", "states", 2023)
+
+    assert list(long.columns) == ["year", "group", "geography", "GEO_ID", "NAME", "variable", "estimate", "margin"]
+    assert len(long) == 6
+    assert long["estimate"].dtype == "float64" and long["margin"].dtype == "float64"
+    assert set(long["variable"]) == {"S2701_C01_001", "S2701_C04_001", "S2701_C05_001"}
+    assert (long["year"] == 2023).all() and (long["group"] == "S2701").all() and (long["geography"] == "states").all()
+
+    row = long.set_index(["NAME", "variable"])
+    assert row.loc[("California", "S2701_C01_001"), "estimate"] == 39000000
+    assert row.loc[("California", "S2701_C01_001"), "margin"] == 12000
+    # sentinels and annotation symbols become missing values
+    assert pd.isna(row.loc[("California", "S2701_C04_001"), "margin"])
+    assert pd.isna(row.loc[("California", "S2701_C05_001"), "margin"])
+    assert row.loc[("New York", "S2701_C05_001"), "margin"] == 0.2
+
+
+def test_to_long_without_margins():
+    df = pd.DataFrame([["0100000US", "United States", "330000000"]], columns=["GEO_ID", "NAME", "B27001_001E"])
+    long = to_long(df, "B27001", "us", 2024)
+    assert long[["variable", "estimate"]].values.tolist() == [["B27001_001", 330000000.0]]
+    assert "margin" not in long.columns